@@ -0,0 +1,71 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+CATALOG_CACHE = 'catalog'
+VERSION_KEY = 'catalog-version'
+
+
+def catalog_version():
+    """
+    Current catalog version, the cache version of every cached response.
+
+    Versions are timestamps rather than a counter, so a version key lost to
+    a cache clear or cull never brings back responses cached before it.
+    """
+    cache = caches[CATALOG_CACHE]
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY, time.time_ns())
+    return version
+
+
+def bump_catalog_version():
+    """
+    Invalidates every cached catalog response at once; the old entries are
+    never read again and expire on their own. Call it after the write is
+    committed.
+    """
+    caches[CATALOG_CACHE].set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def response_cache_key(request):
+    # Parameter order and empty parameters don't change the response
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+        if value
+    )
+    url = f'{request.build_absolute_uri(request.path)}?{urlencode(params)}'
+    return 'catalog-response:' + hashlib.md5(url.encode()).hexdigest()
+
+
+def cache_catalog_response(method):
+    """
+    Caches the data of a successful catalog GET response under the current
+    catalog version.
+    """
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        cache = caches[CATALOG_CACHE]
+        # Read before the queries run, so a write during them can't end up
+        # cached under the version that follows it
+        version = catalog_version()
+        key = response_cache_key(request)
+
+        data = cache.get(key, version=version)
+        if data is not None:
+            return Response(data)
+
+        response = method(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, version=version)
+        return response
+
+    return wrapper
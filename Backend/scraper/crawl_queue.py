@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import CrawlTask
+
+OPEN_STATUSES = ['pending', 'leased']
+
+
+def enqueue(scraping_log, kind, urls, fingerprints=None):
+    """Adds crawl tasks for ``urls``; URLs already queued for the log are ignored."""
+    fingerprints = fingerprints or {}
+    CrawlTask.objects.bulk_create(
+        [
+            CrawlTask(
+                scraping_log=scraping_log,
+                kind=kind,
+                url=url,
+                fingerprint=fingerprints.get(url, '')
+            )
+            for url in urls
+        ],
+        ignore_conflicts=True
+    )
+
+
+def claim(scraping_log, worker, limit, lease_seconds=300):
+    """
+    Leases up to ``limit`` tasks of the log to ``worker``.
+
+    Pending tasks and tasks whose lease has expired (their worker died or
+    hung) are eligible. Rows are locked with SKIP LOCKED, so concurrent
+    workers always get disjoint tasks. Book pages are handed out before
+    listing pages to keep the queue short.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            CrawlTask.objects.select_for_update(skip_locked=True)
+            .filter(scraping_log=scraping_log)
+            .filter(Q(status='pending') | Q(status='leased', leased_until__lt=now))
+            .order_by('kind', 'id')[:limit]
+        )
+        if tasks:
+            CrawlTask.objects.filter(id__in=[task.id for task in tasks]).update(
+                status='leased',
+                worker=worker,
+                leased_until=now + timedelta(seconds=lease_seconds),
+                attempts=F('attempts') + 1
+            )
+    for task in tasks:
+        task.attempts += 1
+    return tasks
+
+
+def complete(tasks):
+    if tasks:
+        CrawlTask.objects.filter(id__in=[task.id for task in tasks]).update(
+            status='done',
+            leased_until=None
+        )
+
+
+def retry(task, error, max_attempts=3):
+    """Returns the task to the queue, or marks it failed after ``max_attempts``."""
+    failed = task.attempts >= max_attempts
+    CrawlTask.objects.filter(id=task.id).update(
+        status='failed' if failed else 'pending',
+        leased_until=None,
+        error_message=str(error)
+    )
+    return failed
+
+
+def release(scraping_log, worker):
+    """Hands the tasks leased by ``worker`` back to the queue."""
+    CrawlTask.objects.filter(
+        scraping_log=scraping_log,
+        worker=worker,
+        status='leased'
+    ).update(status='pending', leased_until=None, attempts=F('attempts') - 1)
+
+
+def active_workers(scraping_log):
+    """Counts the workers that currently hold an unexpired lease on the log's tasks."""
+    return (
+        CrawlTask.objects.filter(
+            scraping_log=scraping_log,
+            status='leased',
+            leased_until__gte=timezone.now()
+        )
+        .values('worker')
+        .distinct()
+        .count()
+    )
+
+
+def has_tasks(scraping_log):
+    return CrawlTask.objects.filter(scraping_log=scraping_log).exists()
+
+
+def has_open_tasks(scraping_log):
+    return CrawlTask.objects.filter(scraping_log=scraping_log, status__in=OPEN_STATUSES).exists()
+
+
+def pending_pages(scraping_log):
+    return CrawlTask.objects.filter(
+        scraping_log=scraping_log,
+        kind='listing',
+        status__in=OPEN_STATUSES
+    ).count()
+
+
+def listing_count(scraping_log):
+    return CrawlTask.objects.filter(scraping_log=scraping_log, kind='listing').count()
@@ -0,0 +1,96 @@
+import math
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import FrontierURL
+
+MIN_INTERVAL = timedelta(hours=1)
+DEFAULT_INTERVAL = timedelta(days=1)
+MAX_INTERVAL = timedelta(days=30)
+
+
+def estimate_change_rate(fetch_count, change_count, observed):
+    """
+    Changes per day estimated from the fetch history.
+
+    A page fetched at regular intervals can change several times between
+    two fetches while only one change is seen, so the raw ratio
+    ``changes / time`` underestimates busy pages. This uses the
+    Cho & Garcia-Molina estimator ``-ln((n - X + 0.5) / (n + 0.5)) / I``
+    for ``n`` revisits with ``X`` detected changes and a mean interval of
+    ``I`` days.
+    """
+    revisits = fetch_count - 1
+    days = observed.total_seconds() / 86400
+    if revisits < 1 or days <= 0:
+        return 0.0
+    change_count = min(change_count, revisits)
+    interval = days / revisits
+    return -math.log((revisits - change_count + 0.5) / (revisits + 0.5)) / interval
+
+
+def next_interval(entry, previous_interval):
+    if entry.fetch_count < 2:
+        return DEFAULT_INTERVAL
+    if entry.change_rate <= 0:
+        # Nothing changed yet: back off exponentially
+        interval = previous_interval * 2
+    else:
+        interval = timedelta(days=1 / entry.change_rate)
+    return max(MIN_INTERVAL, min(MAX_INTERVAL, interval))
+
+
+def observe(entry, content_hash, now):
+    """Updates ``entry`` with a fetch made at ``now`` and schedules its next visit."""
+    previous_interval = DEFAULT_INTERVAL
+    if entry.last_fetched_at and entry.next_fetch_at:
+        previous_interval = max(entry.next_fetch_at - entry.last_fetched_at, MIN_INTERVAL)
+
+    if entry.fetch_count and content_hash != entry.content_hash:
+        entry.change_count += 1
+        entry.last_changed_at = now
+    entry.content_hash = content_hash
+    entry.fetch_count += 1
+    entry.first_fetched_at = entry.first_fetched_at or now
+    entry.last_fetched_at = now
+
+    entry.change_rate = estimate_change_rate(
+        entry.fetch_count, entry.change_count, now - entry.first_fetched_at
+    )
+    entry.next_fetch_at = now + next_interval(entry, previous_interval)
+    return entry
+
+
+def record(observations, now=None):
+    """
+    Stores fetch results given as ``(url, kind, content_hash)`` tuples and
+    reschedules their URLs.
+    """
+    if not observations:
+        return
+    now = now or timezone.now()
+
+    latest = {url: (kind, content_hash) for url, kind, content_hash in observations}
+    existing = FrontierURL.objects.in_bulk(list(latest), field_name='url')
+
+    created = []
+    for url, (kind, content_hash) in latest.items():
+        entry = existing.get(url)
+        if entry is None:
+            entry = FrontierURL(url=url, kind=kind, next_fetch_at=now)
+            created.append(entry)
+        observe(entry, content_hash, now)
+
+    FrontierURL.objects.bulk_create(created, ignore_conflicts=True)
+    FrontierURL.objects.bulk_update(
+        list(existing.values()),
+        [
+            'content_hash', 'first_fetched_at', 'last_fetched_at', 'last_changed_at',
+            'fetch_count', 'change_count', 'change_rate', 'next_fetch_at'
+        ]
+    )
+
+
+def due(now=None):
+    return FrontierURL.objects.filter(next_fetch_at__lte=now or timezone.now())
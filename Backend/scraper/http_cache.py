@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """Stand-in for ``requests.Response`` built from a cache entry."""
+
+    status_code = 200
+    from_cache = True
+
+    def __init__(self, url, content, headers):
+        self.url = url
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+
+    def raise_for_status(self):
+        pass
+
+
+class ResponseCache:
+    """
+    On-disk cache of response bodies keyed by URL.
+
+    Each entry is a ``<key>.body`` file plus a ``<key>.json`` file holding the
+    validators (ETag / Last-Modified) used to revalidate it with a conditional
+    GET. The body file's mtime is the LRU clock, so eviction order survives
+    restarts; once the bodies exceed ``max_bytes`` the least recently used
+    entries are removed.
+    """
+
+    STORED_HEADERS = ('ETag', 'Last-Modified', 'Content-Type')
+
+    def __init__(self, cache_dir, max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        bodies = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.body'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                bodies.append((stat.st_mtime, name[:-len('.body')], stat.st_size))
+
+        for _, key, size in sorted(bodies):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.body', base + '.json'
+
+    def lookup(self, url):
+        key = self._key(url)
+        with self._lock:
+            if key not in self._entries:
+                return None
+
+        _, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta.get('ETag'):
+            headers['If-None-Match'] = meta['ETag']
+        if meta.get('Last-Modified'):
+            headers['If-Modified-Since'] = meta['Last-Modified']
+        return headers
+
+    def load(self, url, meta):
+        key = self._key(url)
+        body_path, _ = self._paths(key)
+        try:
+            with open(body_path, 'rb') as body_file:
+                content = body_file.read()
+            os.utime(body_path)
+        except OSError:
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+
+        return CachedResponse(url, content, meta)
+
+    def store(self, url, response):
+        with self._lock:
+            self.misses += 1
+
+        meta = {
+            header: response.headers[header]
+            for header in self.STORED_HEADERS
+            if response.headers.get(header)
+        }
+        if 'ETag' not in meta and 'Last-Modified' not in meta:
+            return
+
+        key = self._key(url)
+        body_path, meta_path = self._paths(key)
+        size = len(response.content)
+        try:
+            self._write_atomic(body_path, response.content)
+            self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Couldn't cache response for {url}: {e}")
+            return
+
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import threading
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from .models import Book
+
+IMAGE_INFO_FIELDS = ['image_width', 'image_height', 'image_size', 'image_format']
+
+
+def describe_image(content):
+    """
+    Returns the Book image metadata columns for an image's bytes. Pillow
+    only reads the header here, the pixels are never decoded.
+    """
+    info = dict.fromkeys(IMAGE_INFO_FIELDS)
+    info['image_size'] = len(content)
+    try:
+        with Image.open(BytesIO(content)) as image:
+            info['image_width'], info['image_height'] = image.size
+            info['image_format'] = (image.format or '').lower()
+    except (OSError, ValueError):
+        # Not an image Pillow understands; keep the size only
+        info['image_format'] = ''
+    return info
+
+
+class ImageStore:
+    """
+    Content-addressed storage for book covers.
+
+    Files are named after the SHA-256 of their bytes
+    (``book_covers/ab/abcdef....jpg``), so identical covers share one file
+    and a cover that is already on disk is never written again. The store
+    also remembers which source URL produced which file, letting the scraper
+    skip downloading covers it has already stored, and the metadata of the
+    stored files, so they don't have to be read again.
+    """
+
+    def __init__(self, storage=None, upload_to='book_covers'):
+        self.storage = storage or Book._meta.get_field('image').storage
+        self.upload_to = upload_to
+        self.known = {}
+        self.infos = {}
+        self._lock = threading.Lock()
+
+    def load_known(self):
+        rows = (
+            Book.objects.exclude(image='')
+            .exclude(image__isnull=True)
+            .values_list('image_source_url', 'image', *IMAGE_INFO_FIELDS)
+        )
+        self.known = {}
+        self.infos = {}
+        for source_url, name, *info in rows:
+            if source_url:
+                self.known[source_url] = name
+            info = dict(zip(IMAGE_INFO_FIELDS, info))
+            if info['image_size'] is not None:
+                self.infos[name] = info
+
+    def lookup(self, source_url):
+        name = self.known.get(source_url)
+        if name and self.storage.exists(name):
+            return name
+        return None
+
+    def name_for(self, content_hash, filename):
+        extension = os.path.splitext(filename)[1].lower() or '.jpg'
+        return f"{self.upload_to}/{content_hash[:2]}/{content_hash}{extension}"
+
+    def content_hash(self, name):
+        return os.path.splitext(os.path.basename(name))[0]
+
+    def info(self, name):
+        """Metadata of a stored file, read from storage only if it isn't known yet."""
+        if name not in self.infos:
+            with self.storage.open(name, 'rb') as image_file:
+                self.infos[name] = describe_image(image_file.read())
+        return self.infos[name]
+
+    def save(self, content, filename, source_url=None):
+        """Stores ``content`` and returns ``(content_hash, name, info)``."""
+        content_hash = hashlib.sha256(content).hexdigest()
+        name = self.name_for(content_hash, filename)
+        with self._lock:
+            if not self.storage.exists(name):
+                name = self.storage.save(name, ContentFile(content))
+
+        if source_url:
+            self.known[source_url] = name
+        self.infos[name] = describe_image(content)
+        return content_hash, name, self.infos[name]
@@ -0,0 +1,115 @@
+import cProfile
+import pstats
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Thread-safe durations of the scrape stages (fetch, parse, image, db...).
+
+    Keeps the count and total of every stage and up to ``max_samples``
+    durations (a uniform reservoir sample on long runs) for the percentiles.
+    """
+
+    def __init__(self, max_samples=5000):
+        self.max_samples = max_samples
+        self._stages = {}
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def add(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'samples': []})
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            samples = entry['samples']
+            if len(samples) < self.max_samples:
+                samples.append(seconds)
+            else:
+                slot = self._random.randrange(entry['count'])
+                if slot < self.max_samples:
+                    samples[slot] = seconds
+
+    def summary(self):
+        with self._lock:
+            stages = {stage: dict(entry, samples=sorted(entry['samples'])) for stage, entry in self._stages.items()}
+        return {
+            stage: {
+                'count': entry['count'],
+                'total_seconds': round(entry['total'], 3),
+                'mean_ms': round(entry['total'] / entry['count'] * 1000, 2),
+                'p50_ms': round(percentile(entry['samples'], 50) * 1000, 2),
+                'p95_ms': round(percentile(entry['samples'], 95) * 1000, 2),
+                'max_ms': round(entry['max'] * 1000, 2),
+            }
+            for stage, entry in stages.items()
+        }
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+class ThreadProfiler:
+    """
+    cProfile for a multi-threaded run.
+
+    cProfile only sees the thread that enabled it, so every thread started
+    while the profiler runs (fetch pools, image workers, the pipeline
+    producer) gets its own profile; ``dump`` merges them into one pstats
+    file.
+    """
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def _new_profile(self):
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        return profile
+
+    def _start_thread(self, frame, event, arg):
+        # Runs once per new thread; enabling cProfile replaces this hook
+        sys.setprofile(None)
+        try:
+            self._new_profile().enable()
+        except ValueError:
+            # Python 3.12+: the first profile already sees every thread
+            pass
+
+    def start(self):
+        threading.setprofile(self._start_thread)
+        self._new_profile().enable()
+        return self
+
+    def stop(self):
+        threading.setprofile(None)
+        sys.setprofile(None)
+
+    def dump(self, path):
+        with self._lock:
+            profiles = list(self._profiles)
+        for profile in profiles:
+            profile.create_stats()
+        stats = pstats.Stats(*[profile for profile in profiles if profile.stats])
+        stats.dump_stats(path)
+        return stats
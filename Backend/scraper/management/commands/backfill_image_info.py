@@ -0,0 +1,68 @@
+import hashlib
+
+from django.core.management.base import BaseCommand
+
+from scraper.image_store import IMAGE_INFO_FIELDS, describe_image
+from scraper.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Fill in cover image width, height, size, format and hash for books stored without them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute the metadata of every book with an image'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of books updated per query'
+        )
+
+    def handle(self, *args, **options):
+        books = Book.objects.exclude(image='').exclude(image__isnull=True).order_by('id')
+        if not options['all']:
+            books = books.filter(image_size__isnull=True)
+        storage = Book._meta.get_field('image').storage
+
+        updated = 0
+        missing = 0
+        # Books sharing a cover (content-addressed names) read the file once
+        infos = {}
+        batch = []
+        for book in books.only('id', 'image', 'image_hash').iterator(chunk_size=options['batch_size']):
+            name = book.image.name
+            if name not in infos:
+                try:
+                    with storage.open(name, 'rb') as image_file:
+                        content = image_file.read()
+                except (FileNotFoundError, OSError) as e:
+                    missing += 1
+                    self.stderr.write(f'Book {book.id}: cannot read {name}: {e}')
+                    continue
+                infos[name] = dict(
+                    describe_image(content),
+                    image_hash=hashlib.sha256(content).hexdigest()
+                )
+
+            info = infos[name]
+            for field in IMAGE_INFO_FIELDS:
+                setattr(book, field, info[field])
+            book.image_hash = book.image_hash or info['image_hash']
+            batch.append(book)
+            if len(batch) >= options['batch_size']:
+                updated += self.save(batch)
+                batch = []
+        updated += self.save(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Image metadata stored for {updated} books'))
+        if missing:
+            self.stdout.write(self.style.WARNING(f'{missing} image files could not be read'))
+
+    def save(self, books):
+        if books:
+            Book.objects.bulk_update(books, IMAGE_INFO_FIELDS + ['image_hash'])
+        return len(books)
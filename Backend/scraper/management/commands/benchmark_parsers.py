@@ -0,0 +1,66 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scraper.parsers import PARSERS, get_parser
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'fixtures',
+    'html'
+)
+FIXTURE_BOOK_URL = 'https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html'
+
+
+class Command(BaseCommand):
+    help = 'Measure parse time per page of every parser engine on saved HTML fixtures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='How many times each page is parsed per engine'
+        )
+        parser.add_argument(
+            '--fixtures-dir',
+            default=FIXTURES_DIR,
+            help='Directory containing listing.html and detail.html'
+        )
+
+    def handle(self, *args, **options):
+        pages = {}
+        for page in ('listing', 'detail'):
+            path = os.path.join(options['fixtures_dir'], f'{page}.html')
+            try:
+                with open(path, 'rb') as fixture:
+                    pages[page] = fixture.read()
+            except OSError as e:
+                raise CommandError(f"Couldn't read fixture {path}: {e}")
+
+        iterations = max(1, options['iterations'])
+        reference = None
+
+        self.stdout.write(f"{'engine':<15}{'listing ms/page':>18}{'detail ms/page':>18}")
+        for name in sorted(PARSERS):
+            engine = get_parser(name)
+            parse = {
+                'listing': lambda content: engine.parse_listing(content),
+                'detail': lambda content: engine.parse_detail(content, FIXTURE_BOOK_URL),
+            }
+
+            output = {page: parse[page](content) for page, content in pages.items()}
+            if reference is None:
+                reference = output
+            elif output != reference:
+                self.stdout.write(self.style.ERROR(f'{name}: output differs from the other engines'))
+
+            timings = {}
+            for page, content in pages.items():
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    parse[page](content)
+                timings[page] = (time.perf_counter() - started) * 1000 / iterations
+
+            self.stdout.write(f"{name:<15}{timings['listing']:>18.2f}{timings['detail']:>18.2f}")
@@ -0,0 +1,181 @@
+import shutil
+import tempfile
+from contextlib import nullcontext
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from scraper.management.commands.scrape_books import Command as ScrapeCommand
+from scraper.parsers import PARSERS
+from scraper.replay import FixtureCatalog, RecordedResponses, ReplayServer
+
+
+class Command(BaseCommand):
+    help = 'Measure scraper throughput against a local replay server (no network needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=5,
+            help='Number of listing pages in the synthetic catalog'
+        )
+        parser.add_argument(
+            '--per-page',
+            type=int,
+            default=20,
+            help='Books per listing page in the synthetic catalog'
+        )
+        parser.add_argument(
+            '--replay-dir',
+            default=None,
+            help='Serve responses recorded with scrape_books --record instead of the synthetic catalog'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=20,
+            help='Delay added to every response in milliseconds'
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0,
+            help='Random extra delay of up to this many milliseconds'
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Share of requests answered with 503 (0.0 - 1.0)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the catalog contents and injected errors'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of book detail requests kept in flight'
+        )
+        parser.add_argument(
+            '--image-workers',
+            type=int,
+            default=4,
+            help='Number of threads downloading cover images'
+        )
+        parser.add_argument(
+            '--rps',
+            type=float,
+            default=0,
+            help='Requests per second allowed by the scraper (0 - unlimited)'
+        )
+        parser.add_argument(
+            '--no-adaptive',
+            action='store_true',
+            help='Keep --concurrency requests in flight instead of adapting it'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of books committed to the database per transaction'
+        )
+        parser.add_argument(
+            '--parser',
+            choices=sorted(PARSERS),
+            default='lxml',
+            help='HTML parser engine'
+        )
+        parser.add_argument(
+            '--skip-images',
+            action='store_true',
+            help='Skip downloading images'
+        )
+        parser.add_argument(
+            '--keep-data',
+            action='store_true',
+            help='Keep the scraped books instead of rolling the run back'
+        )
+        parser.add_argument(
+            '--min-books-per-sec',
+            type=float,
+            default=None,
+            help='Fail when throughput drops below this value'
+        )
+
+    def handle(self, *args, **options):
+        if options['replay_dir']:
+            source = RecordedResponses(options['replay_dir'])
+        else:
+            source = FixtureCatalog(
+                pages=options['pages'],
+                per_page=options['per_page'],
+                seed=options['seed']
+            )
+
+        server = ReplayServer(
+            source,
+            latency=options['latency'] / 1000,
+            jitter=options['jitter'] / 1000,
+            error_rate=options['error_rate'],
+            seed=options['seed']
+        )
+
+        # Covers of rolled back books would be left behind in MEDIA_ROOT
+        media_root = None if options['keep_data'] else tempfile.mkdtemp(prefix='benchmark_scraper_')
+        media = override_settings(MEDIA_ROOT=media_root) if media_root else nullcontext()
+
+        scrape = ScrapeCommand(stdout=StringIO(), stderr=StringIO())
+        try:
+            with server, media:
+                with transaction.atomic():
+                    call_command(
+                        scrape,
+                        base_url=server.url,
+                        no_cache=True,
+                        concurrency=options['concurrency'],
+                        image_workers=options['image_workers'],
+                        rps=options['rps'],
+                        no_adaptive=options['no_adaptive'],
+                        batch_size=options['batch_size'],
+                        parser=options['parser'],
+                        skip_images=options['skip_images'],
+                    )
+                    scraping_log = scrape.scraping_log
+                    if not options['keep_data']:
+                        transaction.set_rollback(True)
+        finally:
+            if media_root:
+                shutil.rmtree(media_root, ignore_errors=True)
+
+        if scraping_log.status != 'completed':
+            raise CommandError(f'Scraping {scraping_log.status}: {scraping_log.error_message}')
+
+        stats = scrape.run_stats
+        elapsed = stats['elapsed']
+        books_per_sec = stats['books'] / elapsed
+
+        self.stdout.write(f"Requests served: {server.requests} ({server.errors} injected errors)")
+        self.stdout.write(f"Pages: {stats['pages']}, books: {stats['books']}, images: {stats['images']}")
+        self.stdout.write(f"Elapsed: {elapsed:.2f}s")
+        self.stdout.write(f"Pages/sec: {stats['pages'] / elapsed:.2f}")
+        self.stdout.write(f"Books/sec: {books_per_sec:.2f}")
+        self.stdout.write(f"Downloaded: {stats['bytes'] / 1024 / 1024:.2f} MB")
+        self.stdout.write(f"DB write time: {stats['db_seconds']:.3f}s")
+        throttle = scrape.stats['throttle']
+        self.stdout.write(
+            f"Concurrency: {throttle['limit']} of {throttle['max_concurrency']} "
+            f"({throttle['congestion_events']} overload responses, {throttle['decreases']} slowdowns)"
+        )
+
+        if options['min_books_per_sec'] is not None and books_per_sec < options['min_books_per_sec']:
+            raise CommandError(
+                f"Throughput {books_per_sec:.2f} books/sec is below {options['min_books_per_sec']:.2f}"
+            )
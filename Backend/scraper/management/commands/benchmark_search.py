@@ -0,0 +1,127 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from scraper.instrumentation import percentile
+from scraper.models import Book, Genre
+from scraper.pagination import BookCursorPagination
+from scraper.search import filter_title, has_trigram, search_books
+
+WORDS = [
+    'dragon', 'kingdom', 'shadow', 'river', 'crown', 'garden', 'winter', 'empire',
+    'secret', 'island', 'forest', 'mirror', 'journey', 'silver', 'storm', 'letters',
+    'night', 'city', 'ocean', 'house', 'memory', 'machine', 'stone', 'fire',
+]
+GENRES = [
+    'Fantasy', 'Science Fiction', 'Mystery', 'Romance', 'History', 'Poetry',
+    'Horror', 'Travel', 'Philosophy', 'Biography', 'Thriller', 'Childrens',
+]
+INDEX_RE = re.compile(r'Index (?:Only )?Scan (?:using|on) (\w+)')
+
+
+class Command(BaseCommand):
+    help = 'Measure book_list filter and search latency on a seeded catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--books',
+            type=int,
+            default=100000,
+            help='Number of books to seed'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of times every query is run'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=20,
+            help='Number of books fetched per query, like one book_list page'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the generated titles and descriptions'
+        )
+        parser.add_argument(
+            '--keep-data',
+            action='store_true',
+            help='Keep the seeded books instead of rolling them back'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.seed_catalog(options['books'], options['seed'])
+            self.stdout.write(
+                f"Seeded {options['books']} books in {len(GENRES)} genres "
+                f"({time.perf_counter() - started:.1f}s, {connection.vendor})"
+            )
+            self.stdout.write(f"pg_trgm: {'installed' if has_trigram(connection.alias) else 'not installed'}")
+
+            books = Book.objects.select_related('genre').defer('search_vector')
+            cases = [
+                ("title icontains '4321'", filter_title(books, '4321')),
+                ("genre icontains 'poet'", books.filter(genre__name__icontains='poet')),
+                ("search 'dragon'", search_books(books, 'dragon')),
+                ("fuzzy title 'dargon kingdm'", filter_title(books, 'dargon kingdm', fuzzy=True)),
+            ]
+            for label, queryset in cases:
+                self.run_case(label, queryset, options['repeat'], options['page_size'])
+
+            if not options['keep_data']:
+                transaction.set_rollback(True)
+
+    def seed_catalog(self, count, seed):
+        rng = random.Random(seed)
+        genres = [
+            Genre.objects.get_or_create(name=name)[0]
+            for name in GENRES
+        ]
+        # Descriptions draw on a large vocabulary so that, as in a real
+        # catalog, a search word only occurs in a small share of the books
+        vocabulary = WORDS + [
+            ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10)))
+            for _ in range(5000)
+        ]
+        books = []
+        for number in range(count):
+            title_words = rng.sample(WORDS, 3)
+            books.append(Book(
+                title=f"The {' '.join(title_words).title()} {number}",
+                description=' '.join(rng.choice(vocabulary) for _ in range(60)),
+                genre=rng.choice(genres),
+                price=rng.randint(100, 6000) / 100,
+                rating=rng.randint(1, 5),
+            ))
+        Book.objects.bulk_create(books, batch_size=2000)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE scraper_book')
+                cursor.execute('ANALYZE scraper_genre')
+
+    def run_case(self, label, queryset, repeat, page_size):
+        ordering = BookCursorPagination().get_ordering(None, queryset, None)
+        page = queryset.order_by(*ordering)[:page_size]
+
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = len(page.all())
+            durations.append(time.perf_counter() - started)
+        durations.sort()
+
+        indexes = sorted(set(INDEX_RE.findall(page.explain()))) if connection.vendor == 'postgresql' else []
+        self.stdout.write(
+            f"{label}: p50 {percentile(durations, 50) * 1000:.1f} ms, "
+            f"p95 {percentile(durations, 95) * 1000:.1f} ms, {rows} rows, "
+            f"indexes: {', '.join(indexes) or 'none'}"
+        )
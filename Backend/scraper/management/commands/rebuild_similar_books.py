@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from scraper.similarity import rebuild_similar_books
+
+
+class Command(BaseCommand):
+    help = 'Recompute the similar books shown on book pages (scrapes only refresh changed genres)'
+
+    def handle(self, *args, **options):
+        links = rebuild_similar_books()
+        self.stdout.write(self.style.SUCCESS(f'Similar books rebuilt: {links} links'))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from scraper.tasks import claim_next_scraping, reclaim_stale_scrapings, run_scraping
+
+
+class Command(BaseCommand):
+    help = 'Run queued scraping jobs (started from the API) in this process'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between checks of an empty queue'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Scrape worker started')
+        try:
+            while True:
+                reclaimed = reclaim_stale_scrapings()
+                if reclaimed:
+                    self.stdout.write(f'Interrupted {reclaimed} scraping(s) that stopped sending heartbeats')
+                scraping_log = claim_next_scraping()
+                if scraping_log is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f'Starting scraping {scraping_log.id}')
+                run_scraping(scraping_log, stdout=self.stdout)
+        except KeyboardInterrupt:
+            self.stdout.write('Scrape worker stopped')
@@ -1,39 +1,183 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from django.db.models import F
 from django.utils import timezone
-from django.core.files.base import ContentFile
-from scraper.models import Book, Genre, ScrapingLog
+from scraper.models import Book, FrontierURL, Genre, ScrapingLog
+from scraper.throttling import AdaptiveThrottle, CircuitBreaker, CircuitOpenError, RateLimiter
+from scraper.http_cache import ResponseCache
+from scraper.pipeline import IDLE, BookPipeline, CrawlControl, ImageStage, PageDone
+from scraper.image_store import IMAGE_INFO_FIELDS, ImageStore
+from scraper.instrumentation import StageTimer, ThreadProfiler
+from scraper.parsers import PARSERS, get_parser
+from scraper.replay import ResponseRecorder
+from scraper import catalog_cache, crawl_queue, frontier, similarity
+from django.conf import settings
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import time
 import logging
+import threading
 from urllib.parse import urljoin, urlparse
-import re
 import os
-from pathlib import Path
 import hashlib
+import json
+import random
+import re
+import socket
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class BookScraper:
-    def __init__(self):
-        self.base_url = "https://books.toscrape.com/"
+    DEFAULT_BASE_URL = "https://books.toscrape.com/"
+    # Responses that mean the site is overloaded or down
+    CONGESTION_STATUSES = {429, 500, 502, 503, 504}
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 30.0
+    
+    def __init__(self, concurrency=1, rps=None, cache=None, known_fingerprints=None,
+                 image_store=None, parser='lxml', base_url=None, recorder=None, control=None,
+                 image_workers=0, adaptive=True, timings=None):
+        self.base_url = base_url or self.DEFAULT_BASE_URL
+        self.start_url = f"{self.base_url}catalogue/page-1.html"
+        self.parser = get_parser(parser)
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = RateLimiter(rps)
+        # Page and image threads share the session, the throttle and the breaker
+        max_in_flight = self.concurrency + max(0, image_workers)
+        self.throttle = AdaptiveThrottle(max_in_flight, adaptive=adaptive)
+        self.circuit_breaker = CircuitBreaker()
+        self.cache = cache
+        self.known_fingerprints = known_fingerprints
+        self.image_store = image_store
+        self.recorder = recorder
+        self.control = control or CrawlControl()
+        self.timings = timings or StageTimer()
+        self.unchanged_count = 0
+        self.bytes_downloaded = 0
+        self.images_downloaded = 0
+        self.errors_count = 0
+        self.observations = []
+        self._stats_lock = threading.Lock()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        adapter = HTTPAdapter(pool_maxsize=max_in_flight)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def fetch(self, url, timeout, stage='fetch'):
+        meta = self.cache.lookup(url) if self.cache else None
+        headers = self.cache.conditional_headers(meta) if meta else {}
+        
+        response = self.request(url, timeout, headers, stage)
+        
+        if meta and response.status_code == 304:
+            cached = self.cache.load(url, meta)
+            if cached:
+                if self.recorder:
+                    self.recorder.save(url, cached)
+                return cached
+            response = self.request(url, timeout, stage=stage)
+        
+        response.raise_for_status()
+        with self._stats_lock:
+            self.bytes_downloaded += len(response.content)
+        if self.cache:
+            self.cache.store(url, response)
+        if self.recorder:
+            self.recorder.save(url, response)
+        return response
+        
+    def request(self, url, timeout, headers=None, stage='fetch'):
+        """
+        Sends a GET through the circuit breaker, the adaptive throttle and
+        the rate limiter, and feeds the outcome back to them. Time spent
+        waiting for a slot is timed as ``throttle_wait``, the request itself
+        as ``stage``.
+        """
+        self.circuit_breaker.before(url)
+        queued = time.monotonic()
+        token = self.throttle.acquire()
+        try:
+            self.rate_limiter.wait(url)
+            started = time.monotonic()
+            self.timings.add('throttle_wait', started - queued)
+            response = self.session.get(url, timeout=timeout, headers=headers)
+        except requests.RequestException:
+            self.throttle.release(token, congested=True)
+            self.circuit_breaker.failure(url)
+            raise
+        except BaseException:
+            self.throttle.release(token)
+            raise
         
+        latency = time.monotonic() - started
+        self.timings.add(stage, latency)
+        congested = response.status_code in self.CONGESTION_STATUSES
+        self.throttle.release(token, latency, congested)
+        if congested:
+            self.circuit_breaker.failure(url)
+            retry_after = self.retry_after(response)
+            if retry_after:
+                self.rate_limiter.pause(url, retry_after)
+        else:
+            self.circuit_breaker.success(url)
+        return response
+    
+    def retry_after(self, response):
+        value = response.headers.get('Retry-After', '')
+        try:
+            return min(float(value), self.RETRY_MAX_DELAY)
+        except ValueError:
+            return None
+    
+    def retry_delay(self, attempt):
+        """Exponential backoff with jitter, so retrying threads don't come back in lockstep."""
+        delay = min(self.RETRY_BASE_DELAY * 2 ** attempt, self.RETRY_MAX_DELAY)
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def should_retry(self, error, attempt, retries):
+        if attempt >= retries - 1 or self.control.cancelled.is_set():
+            return False
+        # The host is down: fail fast instead of sleeping on it
+        return not isinstance(error, CircuitOpenError)
+    
+    def throttle_state(self):
+        return {
+            'throttle': self.throttle.state(),
+            'circuits': self.circuit_breaker.state(),
+        }
+    
+    def observe(self, url, kind, content):
+        """Remembers what a page looked like for the recrawl scheduler (see scraper.frontier)."""
+        content_hash = hashlib.sha256(
+            json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        with self._stats_lock:
+            self.observations.append((url, kind, content_hash))
+    
+    def drain_observations(self):
+        with self._stats_lock:
+            observations, self.observations = self.observations, []
+        return observations
+    
+    def count_error(self):
+        with self._stats_lock:
+            self.errors_count += 1
+    
     def get_page(self, url, retries=3):
         for attempt in range(retries):
             try:
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
+                response = self.fetch(url, timeout=10)
                 return response
             except requests.RequestException as e:
                 logger.warning(f"Attempt {attempt + 1} wasn't successfull for {url}: {e}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)  
+                if self.should_retry(e, attempt, retries):
+                    time.sleep(self.retry_delay(attempt))
                 else:
                     logger.error(f"Couldn't get the page {url}")
                     return None
@@ -41,8 +185,7 @@ class BookScraper:
     def download_image(self, image_url, retries=3):
         for attempt in range(retries):
             try:
-                response = self.session.get(image_url, timeout=15)
-                response.raise_for_status()
+                response = self.fetch(image_url, timeout=15, stage='image_download')
                 parsed_url = urlparse(image_url)
                 original_filename = os.path.basename(parsed_url.path)
                 
@@ -65,156 +208,243 @@ class BookScraper:
                 
             except requests.RequestException as e:
                 logger.warning(f"Image download attempt {attempt + 1} failed for {image_url}: {e}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+                if self.should_retry(e, attempt, retries):
+                    time.sleep(self.retry_delay(attempt))
                 else:
                     logger.error(f"Couldn't download image {image_url}")
                     return None, None
     
-    def parse_price(self, price_text):
-        if not price_text:
-            return 0.0
-
-        price_clean = re.sub(r'[£$€]', '', price_text.strip())
-        try:
-            return float(price_clean)
-        except ValueError:
-            return 0.0
-    
-    def parse_rating(self, rating_class):
-        rating_map = {
-            'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5
-        }
-        for word, rating in rating_map.items():
-            if word in rating_class:
-                return rating
-        return 0
+    def store_image(self, image_url):
+        image_name = self.image_store.lookup(image_url)
+        if image_name:
+            logger.info(f"Image already stored: {image_name}")
+            return (
+                self.image_store.content_hash(image_name),
+                image_name,
+                self.image_store.info(image_name)
+            )
+        
+        logger.info(f"Downloading image: {image_url}")
+        image_content, image_filename = self.download_image(image_url)
+        if not image_content:
+            return None
+        
+        logger.info(f"Image downloaded successfully: {image_filename}")
+        with self._stats_lock:
+            self.images_downloaded += 1
+        with self.timings.time('image_save'):
+            return self.image_store.save(image_content, image_filename, source_url=image_url)
     
     def scrape_book_details(self, book_url):
+        if not self.control.wait():
+            return None
+        
+        logger.info(f"Book processing: {book_url}")
         response = self.get_page(book_url)
         if not response:
             return None
-            
-        soup = BeautifulSoup(response.content, 'html.parser')
         
         try:
-            title = soup.find('h1').text.strip()
-            product_info = {}
-            table = soup.find('table', class_='table table-striped')
-            if table:
-                for row in table.find_all('tr'):
-                    cells = row.find_all('td')
-                    if len(cells) == 2:
-                        key = cells[0].text.strip()
-                        value = cells[1].text.strip()
-                        product_info[key] = value
-            
-            price_elem = soup.find('p', class_='price_color')
-            price = self.parse_price(price_elem.text if price_elem else '0')
-            rating_elem = soup.find('p', class_='star-rating')
-            rating = 0
-
-            if rating_elem:
-                rating_class = ' '.join(rating_elem.get('class', []))
-                rating = self.parse_rating(rating_class)
-            
-            description_elem = soup.find('div', id='product_description')
-            description = ''
-            if description_elem:
-                desc_p = description_elem.find_next_sibling('p')
-                if desc_p:
-                    description = desc_p.text.strip()
-            
-            availability_elem = soup.find('p', class_='instock availability')
-            in_stock = availability_elem is not None
-            
-            breadcrumb = soup.find('ul', class_='breadcrumb')
-            genre = 'General'
-            if breadcrumb:
-                links = breadcrumb.find_all('a')
-                if len(links) >= 3: 
-                    genre = links[2].text.strip()
-            
-            image_url = None
-            image_elem = soup.find('div', class_='item active')
-            if image_elem:
-                img_tag = image_elem.find('img')
-                if img_tag and img_tag.get('src'):
-                    image_url = urljoin(book_url, img_tag['src'])
-            
-            image_content = None
-            image_filename = None
-            if image_url:
-                logger.info(f"Downloading image: {image_url}")
-                image_content, image_filename = self.download_image(image_url)
-                if image_content:
-                    logger.info(f"Image downloaded successfully: {image_filename}")
-                else:
-                    logger.warning(f"Failed to download image for {title}")
-            
-            return {
-                'title': title,
-                'isbn': product_info.get('ISBN', ''),
-                'genre': genre,
-                'price': price,
-                'rating': rating,
-                'description': description,
-                'in_stock': in_stock,
-                'availability': product_info.get('Availability', ''),
-                'url': book_url,
-                'image_url': image_url,
-                'image_content': image_content,
-                'image_filename': image_filename
-            }
-            
+            with self.timings.time('parse'):
+                book_data = self.parser.parse_detail(response.content, book_url)
         except Exception as e:
             logger.error(f"Parsing book error {book_url}: {e}")
             return None
+        
+        self.observe(book_url, 'book', book_data)
+        book_data['url'] = book_url
+        return book_data
     
-    def scrape_books_from_page(self, page_url):
+    def scrape_listing(self, page_url):
+        """
+        Returns ``(listing, next_url, pages_left)`` for a listing page, where
+        ``listing`` holds ``(book_url, fingerprint)`` of the books that need
+        their details fetched, or None if the page couldn't be loaded.
+        """
         response = self.get_page(page_url)
         if not response:
-            return []
+            return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        books = []
+        with self.timings.time('parse'):
+            page = self.parser.parse_listing(response.content)
+        self.observe(page_url, 'listing', page)
+        listing = [
+            (urljoin(page_url, entry['href']), self.listing_fingerprint(entry))
+            for entry in page['books']
+        ]
         
-        book_elements = soup.find_all('article', class_='product_pod')
+        if self.known_fingerprints is not None:
+            changed = [
+                (book_url, fingerprint) for book_url, fingerprint in listing
+                if self.known_fingerprints.get(book_url) != fingerprint
+            ]
+            with self._stats_lock:
+                self.unchanged_count += len(listing) - len(changed)
+            listing = changed
         
-        for book_elem in book_elements:
-            try:
-                link_elem = book_elem.find('h3').find('a')
-                if link_elem:
-                    href = link_elem['href']
-                    if not href.startswith('catalogue/'):
-                        href = 'catalogue/' + href
-                    book_url = urljoin(self.base_url, href)
-                    
-                    logger.info(f"Book processing: {book_url}")
-                    
-                    book_data = self.scrape_book_details(book_url)
-                    if book_data:
-                        books.append(book_data)
-                        logger.info(f"Book's data gathered: {book_data['title']}")
-                    
-                    time.sleep(1)
-                    
-            except Exception as e:
-                logger.error(f"Book processing error: {e}")
-                continue
+        next_url = urljoin(page_url, page['next']) if page['next'] else None
+        pages_left = None
+        if page['page'] and page['pages']:
+            pages_left = page['pages'] - page['page']
+        return listing, next_url, pages_left
+    
+    def scrape_books_from_page(self, page_url):
+        result = self.scrape_listing(page_url)
+        if result is None:
+            return None
         
-        return books
+        listing, next_url, pages_left = result
+        book_urls = [book_url for book_url, _ in listing]
+        books = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = executor.map(self.scrape_book_details, book_urls)
+            for (book_url, fingerprint), book_data in zip(listing, results):
+                if book_data:
+                    book_data['listing_hash'] = fingerprint
+                    books.append(book_data)
+                    logger.info(f"Book's data gathered: {book_data['title']}")
+                elif not self.control.cancelled.is_set():
+                    self.count_error()
+                    logger.warning(f"No data gathered for {book_url}")
+        
+        return books, next_url, pages_left
+    
+    def expand_pages(self, next_url, pages_left):
+        """
+        Lists the remaining pages of a listing (``page-N.html`` onwards)
+        so they can be crawled in parallel instead of one ``next`` link at
+        a time.
+        """
+        if not next_url:
+            return []
+        match = re.search(r'page-(\d+)\.html$', next_url)
+        if not match or not pages_left:
+            return [next_url]
+        first = int(match.group(1))
+        prefix = next_url[:match.start()]
+        return [f'{prefix}page-{number}.html' for number in range(first, first + pages_left)]
+    
+    def discover_categories(self):
+        response = self.get_page(self.start_url)
+        if not response:
+            raise RuntimeError(f"Couldn't load category index {self.start_url}")
+        return [
+            urljoin(self.start_url, href)
+            for href in self.parser.parse_categories(response.content)
+        ]
+    
+    def iter_books(self, pending, max_pages=None):
+        pending = deque(pending)
+        failed = []
+        pages = 0
+        # Listing pages left in the chain starting at a pending URL, taken
+        # from the "Page N of M" pager; unknown chains count as one page.
+        chain_lengths = {}
+        while pending and (max_pages is None or pages < max_pages):
+            if not self.control.wait():
+                return
+            
+            page_url = pending.popleft()
+            chain_lengths.pop(page_url, None)
+            logger.info(f"Page processing: {page_url}")
+            
+            result = self.scrape_books_from_page(page_url)
+            if self.control.cancelled.is_set():
+                # The page stays pending in the checkpoint; keep what was gathered.
+                if result is not None:
+                    yield from result[0]
+                return
+            
+            if result is None:
+                self.count_error()
+                failed.append(page_url)
+            else:
+                books, next_url, pages_left = result
+                yield from books
+                if next_url:
+                    pending.appendleft(next_url)
+                    if pages_left:
+                        chain_lengths[next_url] = pages_left
+            
+            pages += 1
+            remaining = sum(chain_lengths.get(url, 1) for url in pending)
+            if max_pages is not None:
+                remaining = min(remaining, max_pages - pages)
+            yield PageDone(page_url, list(pending) + failed, result is None, remaining)
+    
+    def listing_fingerprint(self, entry):
+        parts = [
+            entry['title'], entry['price'], entry['rating'],
+            entry['availability'], entry['thumbnail']
+        ]
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
 
 
 class Command(BaseCommand):
     help = 'Book scraping from books.toscrape.com with image download'
     
+    # Seconds between checks of the scraping log for stop/pause requests
+    CONTROL_POLL_INTERVAL = 2.0
+    # Seconds a --worker waits before asking the task queue again when it is empty
+    WORKER_IDLE_INTERVAL = 0.2
+    # Seconds between heartbeats while nothing else is written to the scraping
+    # log; tasks.reclaim_stale_scrapings interrupts a log that stops getting them
+    HEARTBEAT_INTERVAL = 30.0
+    
+    # Columns compared with the stored book to decide whether a recrawl changed it
+    CONTENT_FIELDS = [
+        'title', 'isbn', 'genre', 'price', 'rating', 'description', 'in_stock', 'availability'
+    ]
+    UPSERT_FIELDS = CONTENT_FIELDS + ['listing_hash', 'last_scraped', 'updated_at']
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.genre_ids = {}
+        self.image_store = ImageStore()
+    
     def add_arguments(self, parser):
         parser.add_argument(
             '--pages',
             type=int,
             default=None,
-            help='Number of pages to scrape (by default - all)'
+            help='Maximum number of listing pages to scrape (by default - all)'
+        )
+        parser.add_argument(
+            '--categories',
+            action='store_true',
+            help='Crawl the catalog category by category instead of the main listing'
+        )
+        parser.add_argument(
+            '--resume',
+            type=int,
+            default=None,
+            metavar='SCRAPING_ID',
+            help='Continue the crawl of an earlier scraping log from its checkpoint'
+        )
+        parser.add_argument(
+            '--log-id',
+            type=int,
+            default=None,
+            metavar='SCRAPING_ID',
+            help='Record the run in this existing scraping log (used by the job worker)'
+        )
+        parser.add_argument(
+            '--worker',
+            action='store_true',
+            help='Crawl from the shared task queue of the scraping log so several '
+                 'processes can work on it (start more with --worker --log-id ID)'
+        )
+        parser.add_argument(
+            '--due',
+            action='store_true',
+            help='Only fetch pages whose scheduled recrawl time has come, plus newly found '
+                 'and changed books'
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=300,
+            help='How long a worker owns claimed tasks before others may take them over'
         )
         parser.add_argument(
             '--verbose',
@@ -226,127 +456,797 @@ class Command(BaseCommand):
             action='store_true',
             help='Skip downloading images'
         )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of book detail/image requests kept in flight'
+        )
+        parser.add_argument(
+            '--rps',
+            type=float,
+            default=4.0,
+            help='Requests per second allowed per host (0 - unlimited); the --worker '
+                 'processes of one crawl split it between them'
+        )
+        parser.add_argument(
+            '--no-adaptive',
+            action='store_true',
+            help='Always keep --concurrency requests in flight instead of adapting to '
+                 'the site\'s latency and errors'
+        )
+        parser.add_argument(
+            '--cache-dir',
+            default=os.path.join(settings.BASE_DIR, '.cache', 'scraper'),
+            help='Directory of the HTTP response cache'
+        )
+        parser.add_argument(
+            '--cache-size',
+            type=int,
+            default=500,
+            help='HTTP response cache size limit in MB'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Disable the HTTP response cache'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only fetch details of books that are new or changed on the listing pages'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of books committed to the database per transaction'
+        )
+        parser.add_argument(
+            '--queue-size',
+            type=int,
+            default=100,
+            help='Maximum number of scraped books waiting to be written'
+        )
+        parser.add_argument(
+            '--image-workers',
+            type=int,
+            default=4,
+            help='Number of threads downloading cover images'
+        )
+        parser.add_argument(
+            '--parser',
+            choices=sorted(PARSERS),
+            default='lxml',
+            help='HTML parser engine'
+        )
+        parser.add_argument(
+            '--base-url',
+            default=BookScraper.DEFAULT_BASE_URL,
+            help='Root URL of the catalog (e.g. a local replay server)'
+        )
+        parser.add_argument(
+            '--profile',
+            nargs='?',
+            const='',
+            default=None,
+            metavar='FILE',
+            help='Write a cProfile dump of the run to FILE (scraping_<id>.prof by default), '
+                 'view it with python -m pstats'
+        )
+        parser.add_argument(
+            '--record',
+            default=None,
+            metavar='DIR',
+            help='Save every fetched response under DIR for offline replay'
+        )
     
     def handle(self, *args, **options):
-        scraping_log = ScrapingLog.objects.create(status='running')
+        if options['due'] and options['worker']:
+            raise CommandError('--due cannot be combined with --worker')
+        
+        scraping_id = options['resume'] or options['log_id']
+        if scraping_id:
+            try:
+                scraping_log = ScrapingLog.objects.get(pk=scraping_id)
+            except ScrapingLog.DoesNotExist:
+                raise CommandError(f"Scraping log {scraping_id} not found")
+            
+            if scraping_log.status == 'completed' and not scraping_log.checkpoint.get('pending'):
+                self.stdout.write(f'Scraping {scraping_log.id} is already completed')
+                return
+            
+            # A job (--log-id) starts or joins a crawl that is still on; only
+            # --resume brings a finished one back. The check and the update are
+            # one query, so a stop requested before the start always wins, and
+            # a paused crawl stays paused until it is resumed.
+            startable = ['queued', 'running']
+            if options['resume']:
+                startable += ['interrupted', 'failed', 'completed']
+            started = ScrapingLog.objects.filter(
+                pk=scraping_log.pk,
+                status__in=startable
+            ).update(status='running', finished_at=None, error_message=None)
+            scraping_log.refresh_from_db(fields=['status', 'finished_at', 'error_message'])
+            if not started and scraping_log.status != 'paused':
+                self.stdout.write(f'Scraping {scraping_log.id} is {scraping_log.status}, nothing to do')
+                return
+        else:
+            scraping_log = ScrapingLog.objects.create(status='running')
+        self.scraping_log = scraping_log
+        self.beat(scraping_log)
+        self.timings = StageTimer()
+        profiler = ThreadProfiler().start() if options['profile'] is not None else None
         
         try:
-            scraper = BookScraper()
+            cache = None
+            if not options['no_cache']:
+                cache = ResponseCache(
+                    options['cache_dir'],
+                    max_bytes=options['cache_size'] * 1024 * 1024
+                )
+            
+            known_fingerprints = None
+            if options['incremental']:
+                known_fingerprints = dict(
+                    Book.objects.filter(source_url__isnull=False)
+                    .exclude(listing_hash='')
+                    .values_list('source_url', 'listing_hash')
+                )
+            
+            self.image_store.load_known()
+            
+            scraper = BookScraper(
+                concurrency=options['concurrency'],
+                rps=options['rps'],
+                cache=cache,
+                known_fingerprints=known_fingerprints,
+                image_store=self.image_store,
+                parser=options['parser'],
+                base_url=options['base_url'],
+                recorder=ResponseRecorder(options['record']) if options['record'] else None,
+                control=CrawlControl(),
+                image_workers=0 if options['skip_images'] else options['image_workers'],
+                adaptive=not options['no_adaptive'],
+                timings=self.timings
+            )
+            if scraping_log.status == 'paused':
+                # Joined a paused crawl: nothing is fetched until it is resumed
+                scraper.control.pause()
             
             if options['verbose']:
                 self.stdout.write('Starting scraping...')
                 if options['skip_images']:
                     self.stdout.write('Image downloading is disabled')
             
-            if options['pages']:
-                books = []
-                for page_num in range(1, options['pages'] + 1):
-                    if options['verbose']:
-                        self.stdout.write(f'Page processing {page_num}...')
-                    
-                    page_url = f"{scraper.base_url}catalogue/page-{page_num}.html"
-                    books_on_page = scraper.scrape_books_from_page(page_url)
-                    books.extend(books_on_page)
-                    time.sleep(2)  
+            image_stage = None
+            if not options['skip_images']:
+                image_stage = ImageStage(
+                    self.store_image(scraper),
+                    workers=options['image_workers'],
+                    maxsize=options['queue_size']
+                )
+            
+            self.run_stats = {
+                'pages': 0, 'books': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'images': 0,
+                'bytes': 0, 'db_seconds': 0.0, 'elapsed': 0.0
+            }
+            self.reported_unchanged = 0
+            self.reported_errors = 0
+            self.reported_images = 0
+            self.stats = {}
+            self.changed_genres = set()
+            self.held_images = deque()
+            self.last_control_poll = started = time.monotonic()
+            
+            if options['worker']:
+                self.crawl_worker(scraping_log, scraper, image_stage, options)
+            elif options['due']:
+                self.crawl_due(scraping_log, scraper, image_stage, options)
             else:
-                books = []
-                for page_num in range(1, 6):
-                    if options['verbose']:
-                        self.stdout.write(f'Page processing {page_num}...')
-                    
-                    page_url = f"{scraper.base_url}catalogue/page-{page_num}.html"
-                    books_on_page = scraper.scrape_books_from_page(page_url)
-                    books.extend(books_on_page)
-                    time.sleep(2)
+                self.crawl(scraping_log, scraper, image_stage, options)
             
-            created_count, updated_count = self.save_books_to_db(
-                books, 
-                options['verbose'], 
-                skip_images=options['skip_images']
+            if image_stage:
+                # Covers held back by a pause are fetched once the crawl is resumed
+                if self.held_images and self.wait_for_control(scraping_log, scraper.control):
+                    self.submit_images(scraper, image_stage)
+                self.collect_images(image_stage.close(), options['verbose'])
+            if self.changed_genres:
+                with self.timings.time('db_similar'):
+                    similarity.rebuild_similar_books(self.changed_genres)
+            self.stats.update(scraper.throttle_state())
+            self.stats['timings'] = self.timings.summary()
+            self.update_progress(
+                scraping_log,
+                images_fetched=self.new_images(scraper),
+                errors_count=self.new_errors(scraper)
+            )
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.run_stats['elapsed'] = elapsed
+            self.run_stats['bytes'] = scraper.bytes_downloaded
+            self.run_stats['db_seconds'] = sum(
+                timing['total_seconds'] for stage, timing in self.timings.summary().items()
+                if stage.startswith('db_')
             )
             
-            scraping_log.status = 'completed'
+            stats = self.run_stats
+            if options['worker'] and not scraper.control.cancelled.is_set() \
+                    and crawl_queue.has_open_tasks(scraping_log):
+                self.stdout.write(
+                    f"Worker is done, other workers are still crawling. "
+                    f"Created: {stats['created']}, updated: {stats['updated']}, unchanged: {stats['unchanged']}"
+                )
+                return
+            
+            if not scraper.control.cancelled.is_set():
+                # A stop requested after the last poll still wins over completion
+                ScrapingLog.objects.filter(pk=scraping_log.pk).exclude(
+                    status='interrupted'
+                ).update(status='completed')
+            scraping_log.refresh_from_db(fields=['status'])
             scraping_log.finished_at = timezone.now()
-            scraping_log.total_books_found = len(books)
-            scraping_log.books_created = created_count
-            scraping_log.books_updated = updated_count
-            scraping_log.save()
+            scraping_log.save(update_fields=['finished_at'])
             
+            if scraping_log.status == 'interrupted':
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Scraping was stopped Created: {stats['created']}, updated: {stats['updated']}, unchanged: {stats['unchanged']}"
+                    )
+                )
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Scraping is finished Created: {stats['created']}, updated: {stats['updated']}, unchanged: {stats['unchanged']}"
+                    )
+                )
+            if scraping_log.checkpoint.get('pending'):
+                self.stdout.write(
+                    f"{len(scraping_log.checkpoint['pending'])} pages left, "
+                    f"continue with --resume {scraping_log.id}"
+                )
+            if options['incremental']:
+                self.stdout.write(f'Unchanged books skipped: {scraper.unchanged_count}')
+            if image_stage:
+                self.stdout.write(f"Images attached: {stats['images']}")
             self.stdout.write(
-                self.style.SUCCESS(
-                    f'Scraping is finished Created: {created_count}, updated: {updated_count}'
+                f"Throughput: {stats['pages'] / elapsed:.2f} pages/sec, "
+                f"{stats['books'] / elapsed:.2f} books/sec ({elapsed:.1f}s), "
+                f"{stats['bytes'] / 1024 / 1024:.1f} MB downloaded, "
+                f"{stats['db_seconds']:.2f}s writing to the database"
+            )
+            if cache:
+                self.stdout.write(
+                    f'HTTP cache: {cache.hits} hits, {cache.misses} downloads'
                 )
+            throttle = self.stats['throttle']
+            self.stdout.write(
+                f"Concurrency: {throttle['limit']} of {throttle['max_concurrency']}, "
+                f"{throttle['congestion_events']} overload responses, "
+                f"{throttle['decreases']} slowdowns"
             )
+            for host, circuit in self.stats['circuits'].items():
+                if circuit['trips']:
+                    self.stdout.write(self.style.WARNING(
+                        f"{host} was unavailable {circuit['trips']} times, "
+                        f"{circuit['rejected']} requests skipped"
+                    ))
+            if options['verbose']:
+                for stage, timing in self.stats['timings'].items():
+                    self.stdout.write(
+                        f"{stage}: {timing['count']} x, {timing['total_seconds']:.2f}s total, "
+                        f"p50 {timing['p50_ms']:.1f}ms, p95 {timing['p95_ms']:.1f}ms"
+                    )
             
         except KeyboardInterrupt:
             scraping_log.status = 'interrupted'
             scraping_log.finished_at = timezone.now()
-            scraping_log.save()
+            scraping_log.save(update_fields=['status', 'finished_at'])
             self.stdout.write(self.style.WARNING('Scraping was interupted by user'))
         except Exception as e:
             scraping_log.status = 'failed'
             scraping_log.error_message = str(e)
             scraping_log.finished_at = timezone.now()
-            scraping_log.save()
+            scraping_log.save(update_fields=['status', 'error_message', 'finished_at'])
             self.stdout.write(self.style.ERROR(f'Error: {e}'))
+        finally:
+            # Stopped and failed runs may have written books too
+            catalog_cache.bump_catalog_version()
+            if profiler:
+                profiler.stop()
+                path = options['profile'] or f'scraping_{scraping_log.id}.prof'
+                profiler.dump(path)
+                self.stdout.write(f'Profile written to {path}')
     
-    def save_books_to_db(self, books_data, verbose=False, skip_images=False):
-        created_count = 0
-        updated_count = 0
+    def crawl(self, scraping_log, scraper, image_stage, options):
+        if 'pending' in scraping_log.checkpoint:
+            pending = scraping_log.checkpoint['pending']
+            if options['verbose']:
+                self.stdout.write(f'Resuming from {len(pending)} pending pages')
+        elif options['categories']:
+            pending = scraper.discover_categories()
+        else:
+            pending = [scraper.start_url]
         
-        with transaction.atomic():
-            for book_data in books_data:
-                try:
-                    genre, _ = Genre.objects.get_or_create(
-                        name=book_data['genre']
-                    )
-                    
-                    defaults = {
-                        'isbn': book_data['isbn'],
-                        'genre': genre,
-                        'price': book_data['price'],
-                        'rating': book_data['rating'],
-                        'description': book_data['description'],
-                        'in_stock': book_data['in_stock'],
-                        'source_url': book_data['url']
-                    }
-                    
-                    book, created = Book.objects.update_or_create(
-                        title=book_data['title'],
-                        defaults=defaults
-                    )
-                    
-                    if not skip_images and book_data['image_content'] and book_data['image_filename']:
-                        try:
-                            image_file = ContentFile(
-                                book_data['image_content'], 
-                                name=book_data['image_filename']
-                            )
-                            
-                            book.image.save(book_data['image_filename'], image_file, save=True)
-                            
-                            if verbose:
-                                self.stdout.write(f"Image saved for: {book.title}")
-                                
-                        except Exception as img_error:
-                            logger.error(f"Image saving error for {book.title}: {img_error}")
-                            if verbose:
-                                self.stdout.write(
-                                    self.style.WARNING(f"Image save failed for {book.title}: {img_error}")
-                                )
-                    
-                    if created:
-                        created_count += 1
-                        if verbose:
-                            self.stdout.write(f"Created: {book.title}")
-                    else:
-                        updated_count += 1
-                        if verbose:
-                            self.stdout.write(f"Updated: {book.title}")
-                            
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f"Saving error {book_data['title']}: {e}")
-                    )
+        scraping_log.checkpoint = {'pending': pending}
+        scraping_log.save(update_fields=['checkpoint'])
+        
+        pipeline = BookPipeline(
+            scraper.iter_books(pending, max_pages=options['pages']),
+            maxsize=options['queue_size'],
+            idle_timeout=self.CONTROL_POLL_INTERVAL
+        )
+        
+        batch = []
+        pages_done = []
+        for item in pipeline:
+            self.poll_control(scraping_log, scraper.control)
+            if item is IDLE:
+                if scraper.control.paused and (batch or pages_done):
+                    self.flush(scraping_log, scraper, batch, pages_done, image_stage, options['verbose'])
+                    batch = []
+                    pages_done = []
+                continue
+            
+            if isinstance(item, PageDone):
+                pages_done.append(item)
+                if not batch:
+                    self.flush(scraping_log, scraper, batch, pages_done, image_stage, options['verbose'])
+                    pages_done = []
+                continue
+            
+            batch.append(item)
+            if len(batch) >= options['batch_size']:
+                self.flush(scraping_log, scraper, batch, pages_done, image_stage, options['verbose'])
+                batch = []
+                pages_done = []
+        
+        self.flush(scraping_log, scraper, batch, pages_done, image_stage, options['verbose'])
+    
+    def crawl_due(self, scraping_log, scraper, image_stage, options):
+        known_urls = set(FrontierURL.objects.values_list('url', flat=True))
+        if known_urls:
+            due = list(frontier.due().values_list('url', 'kind'))
+            listing_urls = deque(url for url, kind in due if kind == 'listing')
+            book_urls = [url for url, kind in due if kind == 'book']
+        else:
+            # Nothing crawled yet: start from the catalog root and learn the schedule
+            if options['categories']:
+                listing_urls = deque(scraper.discover_categories())
+            else:
+                listing_urls = deque([scraper.start_url])
+            book_urls = []
+        
+        if options['verbose']:
+            self.stdout.write(f'Due: {len(listing_urls)} listing pages, {len(book_urls)} books')
+        
+        known_fingerprints = dict(
+            Book.objects.filter(source_url__isnull=False)
+            .values_list('source_url', 'listing_hash')
+        )
+        fingerprints = {}
+        queued = set(book_urls)
+        pages = 0
+        while listing_urls and (options['pages'] is None or pages < options['pages']):
+            if not self.wait_for_control(scraping_log, scraper.control):
+                return
+            
+            page_url = listing_urls.popleft()
+            result = scraper.scrape_listing(page_url)
+            pages += 1
+            self.run_stats['pages'] += 1
+            if result is None:
+                scraper.count_error()
+                continue
+            
+            listing, next_url, _ = result
+            for book_url, fingerprint in listing:
+                fingerprints[book_url] = fingerprint
+                if book_url in queued:
+                    continue
+                if known_fingerprints.get(book_url) == fingerprint:
+                    scraper.unchanged_count += 1
+                    continue
+                # New book, or its price/rating/availability changed on the listing
+                queued.add(book_url)
+                book_urls.append(book_url)
+            # Pages that are known but not due yet are left for their turn
+            if next_url and next_url not in known_urls:
+                listing_urls.append(next_url)
+        
+        progress = self.write_batch(scraping_log, scraper, [], image_stage, options['verbose'])
+        progress['pages_completed'] = pages
+        self.update_progress(scraping_log, {'pages_remaining': len(listing_urls)}, **progress)
+        
+        with ThreadPoolExecutor(max_workers=scraper.concurrency) as executor:
+            for start in range(0, len(book_urls), options['batch_size']):
+                if not self.wait_for_control(scraping_log, scraper.control):
+                    return
+                
+                chunk = book_urls[start:start + options['batch_size']]
+                batch = []
+                for book_url, book_data in zip(chunk, executor.map(scraper.scrape_book_details, chunk)):
+                    if book_data:
+                        book_data['listing_hash'] = (
+                            fingerprints.get(book_url)
+                            or known_fingerprints.get(book_url, '')
+                        )
+                        batch.append(book_data)
+                    elif not scraper.control.cancelled.is_set():
+                        scraper.count_error()
+                
+                self.update_progress(
+                    scraping_log,
+                    **self.write_batch(scraping_log, scraper, batch, image_stage, options['verbose'])
+                )
+    
+    def wait_for_control(self, scraping_log, control):
+        """Polls for stop/pause requests; blocks while paused and returns False once stopped."""
+        while True:
+            self.poll_control(scraping_log, control)
+            if control.cancelled.is_set():
+                return False
+            if not control.paused:
+                return True
+            time.sleep(self.WORKER_IDLE_INTERVAL)
+    
+    def crawl_worker(self, scraping_log, scraper, image_stage, options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        if not crawl_queue.has_tasks(scraping_log):
+            if options['categories']:
+                seeds = scraper.discover_categories()
+            else:
+                seeds = [scraper.start_url]
+            crawl_queue.enqueue(scraping_log, 'listing', seeds)
+        
+        if options['verbose']:
+            self.stdout.write(f'Worker {worker} joined scraping {scraping_log.id}')
         
-        return created_count, updated_count
\ No newline at end of file
+        executor = ThreadPoolExecutor(max_workers=scraper.concurrency)
+        try:
+            while True:
+                if not self.wait_for_control(scraping_log, scraper.control):
+                    break
+                
+                tasks = crawl_queue.claim(
+                    scraping_log, worker,
+                    limit=options['batch_size'],
+                    lease_seconds=options['lease_seconds']
+                )
+                if not tasks:
+                    if not crawl_queue.has_open_tasks(scraping_log):
+                        break
+                    # Other workers still hold leases (and may add new tasks)
+                    time.sleep(self.WORKER_IDLE_INTERVAL)
+                    continue
+                
+                if options['rps']:
+                    # Workers of one crawl share the per-host budget
+                    scraper.rate_limiter.set_rps(options['rps'] / crawl_queue.active_workers(scraping_log))
+                self.run_tasks(scraping_log, scraper, executor, tasks, image_stage, options)
+        finally:
+            executor.shutdown(wait=True)
+            crawl_queue.release(scraping_log, worker)
+    
+    def run_tasks(self, scraping_log, scraper, executor, tasks, image_stage, options):
+        listing_tasks = [task for task in tasks if task.kind == 'listing']
+        book_tasks = [task for task in tasks if task.kind == 'book']
+        done = []
+        
+        results = executor.map(lambda task: scraper.scrape_listing(task.url), listing_tasks)
+        for task, result in zip(listing_tasks, results):
+            if result is None:
+                self.retry_task(scraper, task, "Couldn't load the page")
+                continue
+            
+            listing, next_url, pages_left = result
+            fingerprints = dict(listing)
+            crawl_queue.enqueue(scraping_log, 'book', list(fingerprints), fingerprints)
+            
+            next_pages = scraper.expand_pages(next_url, pages_left)
+            if options['pages'] is not None:
+                allowed = options['pages'] - crawl_queue.listing_count(scraping_log)
+                next_pages = next_pages[:max(allowed, 0)]
+            crawl_queue.enqueue(scraping_log, 'listing', next_pages)
+            done.append(task)
+        
+        batch = []
+        results = executor.map(lambda task: scraper.scrape_book_details(task.url), book_tasks)
+        for task, book_data in zip(book_tasks, results):
+            if book_data:
+                book_data['listing_hash'] = task.fingerprint
+                batch.append(book_data)
+                done.append(task)
+            elif not scraper.control.cancelled.is_set():
+                self.retry_task(scraper, task, f"No data gathered for {task.url}")
+        
+        pages = len(done) - len(batch)
+        self.run_stats['pages'] += pages
+        progress = self.write_batch(scraping_log, scraper, batch, image_stage, options['verbose'])
+        progress['pages_completed'] = pages
+        self.update_progress(
+            scraping_log,
+            {'pages_remaining': crawl_queue.pending_pages(scraping_log)},
+            **progress
+        )
+        crawl_queue.complete(done)
+    
+    def retry_task(self, scraper, task, error):
+        if crawl_queue.retry(task, error):
+            scraper.count_error()
+            logger.error(f"Giving up on {task.url}: {error}")
+    
+    def poll_control(self, scraping_log, control):
+        now = time.monotonic()
+        if now - self.last_control_poll < self.CONTROL_POLL_INTERVAL:
+            return
+        self.last_control_poll = now
+        if now - self.last_heartbeat >= self.HEARTBEAT_INTERVAL:
+            self.beat(scraping_log)
+        
+        status = ScrapingLog.objects.filter(pk=scraping_log.pk).values_list('status', flat=True).first()
+        if status == 'interrupted' and not control.cancelled.is_set():
+            self.stdout.write('Stop requested, finishing in-flight requests...')
+            control.cancel()
+        elif status == 'paused' and not control.paused:
+            self.stdout.write('Scraping paused')
+            control.pause()
+        elif status == 'running' and control.paused:
+            self.stdout.write('Scraping resumed')
+            control.resume()
+    
+    def beat(self, scraping_log):
+        self.last_heartbeat = time.monotonic()
+        ScrapingLog.objects.filter(pk=scraping_log.pk).update(heartbeat_at=timezone.now())
+    
+    def flush(self, scraping_log, scraper, batch, pages_done, image_stage, verbose=False):
+        progress = self.write_batch(scraping_log, scraper, batch, image_stage, verbose)
+        
+        values = {}
+        if pages_done:
+            self.run_stats['pages'] += len(pages_done)
+            progress['pages_completed'] = len(pages_done)
+            scraping_log.checkpoint = {'pending': pages_done[-1].pending}
+            values = {
+                'checkpoint': scraping_log.checkpoint,
+                'pages_remaining': pages_done[-1].remaining,
+            }
+        
+        self.update_progress(scraping_log, values, **progress)
+    
+    def write_batch(self, scraping_log, scraper, batch, image_stage, verbose=False):
+        """Saves scraped books, hands their covers to the image stage and returns the progress counters."""
+        progress = {}
+        if batch:
+            with self.timings.time('db_books'):
+                created, updated, unchanged = self.save_books_to_db(batch, verbose)
+            self.run_stats['books'] += len(batch)
+            self.run_stats['created'] += created
+            self.run_stats['updated'] += updated
+            self.run_stats['unchanged'] += unchanged
+            progress['books_created'] = created
+            progress['books_updated'] = updated
+            progress['books_unchanged'] = unchanged
+        
+        if image_stage:
+            self.held_images.extend(book_data for book_data in batch if book_data['image_url'])
+            self.submit_images(scraper, image_stage)
+            self.collect_images(image_stage.drain(), verbose)
+            # Covers taken from the image store were not fetched
+            progress['images_fetched'] = self.new_images(scraper)
+        
+        with self.timings.time('db_frontier'):
+            frontier.record(scraper.drain_observations())
+        
+        # Books skipped on the listing (--incremental, --due) weren't fetched at all
+        skipped = scraper.unchanged_count - self.reported_unchanged
+        self.reported_unchanged += skipped
+        self.run_stats['unchanged'] += skipped
+        progress['books_unchanged'] = progress.get('books_unchanged', 0) + skipped
+        progress['total_books_found'] = len(batch) + skipped
+        progress['errors_count'] = self.new_errors(scraper)
+        self.stats.update(scraper.throttle_state())
+        self.stats['timings'] = self.timings.summary()
+        return progress
+    
+    def collect_images(self, results, verbose=False):
+        with self.timings.time('db_images'):
+            self.run_stats['images'] += self.attach_images(results, verbose)
+    
+    def new_errors(self, scraper):
+        errors = scraper.errors_count - self.reported_errors
+        self.reported_errors += errors
+        return errors
+    
+    def new_images(self, scraper):
+        images = scraper.images_downloaded - self.reported_images
+        self.reported_images += images
+        return images
+    
+    def update_progress(self, scraping_log, values=None, **counters):
+        """
+        Adds ``counters`` to the scraping log in a single UPDATE with F()
+        expressions, together with the latest fetch layer state, stage timings
+        and a heartbeat.
+        """
+        updates = {field: F(field) + count for field, count in counters.items() if count}
+        updates.update(values or {})
+        if not updates:
+            return
+        updates['stats'] = self.stats
+        updates['heartbeat_at'] = timezone.now()
+        self.last_heartbeat = time.monotonic()
+        
+        with self.timings.time('db_progress'):
+            ScrapingLog.objects.filter(pk=scraping_log.pk).update(**updates)
+    
+    def save_books_to_db(self, books_data, verbose=False):
+        """
+        Writes scraped books and returns ``(created, updated, unchanged)``.
+        
+        Books are compared with the stored rows first and only new or
+        changed ones are written, so ``updated_at`` only moves when the
+        content did. A book whose listing entry changed without any change
+        to its content (e.g. a new thumbnail URL) only gets its
+        ``listing_hash`` updated.
+        """
+        books_by_url = {book_data['url']: book_data for book_data in books_data}
+        if not books_by_url:
+            return 0, 0, 0
+        
+        genre_ids = self.resolve_genres(
+            {book_data['genre'] for book_data in books_by_url.values()}
+        )
+        content_fields = [Book._meta.get_field(name) for name in self.CONTENT_FIELDS]
+        stored = {
+            row['source_url']: row
+            for row in Book.objects.filter(source_url__in=list(books_by_url)).values(
+                'id', 'source_url', 'listing_hash', *[field.attname for field in content_fields]
+            )
+        }
+        
+        now = timezone.now()
+        writes = {'created': [], 'updated': [], 'relisted': [], 'unchanged': []}
+        for url, book_data in books_by_url.items():
+            book = Book(
+                title=book_data['title'],
+                isbn=book_data['isbn'],
+                genre_id=genre_ids.get(book_data['genre']),
+                price=book_data['price'],
+                rating=book_data['rating'],
+                description=book_data['description'],
+                in_stock=book_data['in_stock'],
+                availability=book_data['availability'],
+                source_url=url,
+                listing_hash=book_data.get('listing_hash', ''),
+                last_scraped=now,
+                updated_at=now,
+            )
+            row = stored.get(url)
+            if row is None:
+                writes['created'].append(book)
+                continue
+            
+            book.id = row['id']
+            if any(
+                field.to_python(getattr(book, field.attname)) != field.to_python(row[field.attname])
+                for field in content_fields
+            ):
+                writes['updated'].append(book)
+                # The book may have left its old genre
+                self.changed_genres.add(row['genre_id'])
+            elif book.listing_hash != row['listing_hash']:
+                writes['relisted'].append(book)
+            else:
+                writes['unchanged'].append(book)
+        
+        try:
+            with transaction.atomic():
+                self.write_books(writes)
+        except DatabaseError as e:
+            logger.error(f"Bulk write failed, saving books one by one: {e}")
+            for action, books in writes.items():
+                for book in list(books):
+                    try:
+                        with transaction.atomic():
+                            self.write_books({action: [book]})
+                    except DatabaseError as book_error:
+                        books.remove(book)
+                        self.stdout.write(
+                            self.style.ERROR(f"Saving error {book.title}: {book_error}")
+                        )
+        
+        for action in ('created', 'updated'):
+            for book in writes[action]:
+                self.changed_genres.add(book.genre_id)
+                if verbose:
+                    self.stdout.write(f"{action.capitalize()}: {book.title}")
+        
+        return (
+            len(writes['created']),
+            len(writes['updated']),
+            len(writes['relisted']) + len(writes['unchanged'])
+        )
+    
+    def write_books(self, writes):
+        if writes.get('created'):
+            # Upsert: another worker may have created the book in the meantime
+            self.upsert_books(writes['created'])
+        if writes.get('updated'):
+            Book.objects.bulk_update(writes['updated'], self.UPSERT_FIELDS)
+        if writes.get('relisted'):
+            Book.objects.bulk_update(writes['relisted'], ['listing_hash'])
+    
+    def resolve_genres(self, names):
+        missing = [name for name in names if name not in self.genre_ids]
+        if missing:
+            Genre.objects.bulk_create(
+                [Genre(name=name) for name in missing],
+                ignore_conflicts=True
+            )
+            self.genre_ids.update(
+                Genre.objects.filter(name__in=missing).values_list('name', 'id')
+            )
+        return self.genre_ids
+    
+    def upsert_books(self, books):
+        Book.objects.bulk_create(
+            books,
+            update_conflicts=True,
+            unique_fields=['source_url'],
+            update_fields=self.UPSERT_FIELDS
+        )
+    
+    def submit_images(self, scraper, image_stage):
+        # Control is only polled on this thread, so a pause can't start
+        # between the check and a submit that blocks on a full stage
+        while self.held_images and not scraper.control.paused:
+            image_stage.submit(self.held_images.popleft())
+    
+    def store_image(self, scraper):
+        def handler(book_data):
+            if not scraper.control.wait():
+                return None
+            stored = scraper.store_image(book_data['image_url'])
+            if not stored:
+                scraper.count_error()
+                logger.warning(f"Failed to download image for {book_data['title']}")
+                return None
+            return (book_data, *stored)
+        return handler
+    
+    def attach_images(self, results, verbose=False):
+        if not results:
+            return 0
+        
+        current = {
+            source_url: (book_id, image, image_size)
+            for source_url, book_id, image, image_size in Book.objects.filter(
+                source_url__in=[result[0]['url'] for result in results]
+            ).values_list('source_url', 'id', 'image', 'image_size')
+        }
+        
+        books = []
+        for book_data, image_hash, image_name, image_info in results:
+            if book_data['url'] not in current:
+                continue
+            book_id, current_image, current_size = current[book_data['url']]
+            # Rows stored before image metadata existed get it filled in
+            if image_name == current_image and current_size is not None:
+                continue
+            
+            books.append(Book(
+                id=book_id,
+                image=image_name,
+                image_source_url=book_data['image_url'],
+                image_hash=image_hash,
+                **image_info
+            ))
+            if verbose:
+                self.stdout.write(f"Image saved for: {book_data['title']}")
+        
+        if books:
+            Book.objects.bulk_update(
+                books,
+                ['image', 'image_source_url', 'image_hash'] + IMAGE_INFO_FIELDS
+            )
+        return len(books)
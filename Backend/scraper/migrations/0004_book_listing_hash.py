@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0003_alter_scrapinglog_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='listing_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Listing fingerprint'),
+        ),
+    ]
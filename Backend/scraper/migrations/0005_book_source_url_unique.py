@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+def clear_duplicate_source_urls(apps, schema_editor):
+    Book = apps.get_model('scraper', 'Book')
+
+    Book.objects.filter(source_url='').update(source_url=None)
+
+    seen = set()
+    duplicate_ids = []
+    books = Book.objects.filter(source_url__isnull=False).order_by('-updated_at', '-id')
+    for book_id, source_url in books.values_list('id', 'source_url'):
+        if source_url in seen:
+            duplicate_ids.append(book_id)
+        else:
+            seen.add(source_url)
+
+    Book.objects.filter(id__in=duplicate_ids).update(source_url=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0004_book_listing_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_source_urls, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='book',
+            name='source_url',
+            field=models.URLField(blank=True, null=True, unique=True, verbose_name='URL sources'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0006_book_image_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapinglog',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='scrapinglog',
+            name='pages_completed',
+            field=models.IntegerField(default=0),
+        ),
+    ]
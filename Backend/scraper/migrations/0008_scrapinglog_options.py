@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0007_scrapinglog_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapinglog',
+            name='options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='scrapinglog',
+            name='status',
+            field=models.CharField(choices=[('queued', 'В черзі'), ('running', 'Виконується'), ('completed', 'Завершено'), ('failed', 'Помилка'), ('interrupted', 'Перервано')], default='running', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0008_scrapinglog_options'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='scrapinglog',
+            name='status',
+            field=models.CharField(choices=[('queued', 'В черзі'), ('running', 'Виконується'), ('paused', 'Призупинено'), ('completed', 'Завершено'), ('failed', 'Помилка'), ('interrupted', 'Перервано')], default='running', max_length=20),
+        ),
+    ]
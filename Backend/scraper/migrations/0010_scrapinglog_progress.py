@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0009_scrapinglog_paused_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapinglog',
+            name='images_fetched',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scrapinglog',
+            name='pages_remaining',
+            field=models.IntegerField(default=0),
+        ),
+    ]
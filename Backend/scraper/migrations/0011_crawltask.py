@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 19:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0010_scrapinglog_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('listing', 'Listing page'), ('book', 'Book page')], max_length=10)),
+                ('url', models.URLField(max_length=500)),
+                ('fingerprint', models.CharField(blank=True, default='', max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('leased', 'Leased'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('scraping_log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crawl_tasks', to='scraper.scrapinglog')),
+            ],
+            options={
+                'verbose_name': 'Crawl task',
+                'verbose_name_plural': 'Crawl tasks',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['scraping_log', 'status', 'kind'], name='scraper_cra_scrapin_bcefac_idx')],
+                'constraints': [models.UniqueConstraint(fields=('scraping_log', 'url'), name='unique_crawl_task_url')],
+            },
+        ),
+    ]
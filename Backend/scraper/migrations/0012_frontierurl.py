@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0011_crawltask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FrontierURL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('kind', models.CharField(choices=[('listing', 'Listing page'), ('book', 'Book page')], max_length=10)),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('first_fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('last_fetched_at', models.DateTimeField(blank=True, null=True)),
+                ('last_changed_at', models.DateTimeField(blank=True, null=True)),
+                ('fetch_count', models.IntegerField(default=0)),
+                ('change_count', models.IntegerField(default=0)),
+                ('change_rate', models.FloatField(default=0.0, verbose_name='Estimated changes per day')),
+                ('next_fetch_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Frontier URL',
+                'verbose_name_plural': 'Frontier URLs',
+                'ordering': ['next_fetch_at'],
+            },
+        ),
+    ]
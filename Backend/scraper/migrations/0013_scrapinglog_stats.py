@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0012_frontierurl'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapinglog',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
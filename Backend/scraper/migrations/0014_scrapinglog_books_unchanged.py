@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0013_scrapinglog_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapinglog',
+            name='books_unchanged',
+            field=models.IntegerField(default=0),
+        ),
+    ]
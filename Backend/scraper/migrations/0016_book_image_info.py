@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0015_similarbook'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='image_format',
+            field=models.CharField(blank=True, default='', max_length=10, verbose_name='Image format'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Image height'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='image_size',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Image size in bytes'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Image width'),
+        ),
+    ]
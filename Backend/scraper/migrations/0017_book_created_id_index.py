@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0016_book_image_info'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['created_at', 'id'], name='scraper_boo_created_a13a1c_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-18 20:00
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The trigger keeps search_vector in step with every write, including the
+# scraper's bulk_create/bulk_update which bypass Model.save(). The genre
+# name lives in another table, so renaming a genre re-fires the book
+# trigger for its books.
+CREATE_SEARCH_TRIGGER = """
+CREATE FUNCTION scraper_book_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(
+            (SELECT name FROM scraper_genre WHERE id = NEW.genre_id), ''
+        )), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER scraper_book_search_vector
+    BEFORE INSERT OR UPDATE OF title, description, genre_id ON scraper_book
+    FOR EACH ROW EXECUTE FUNCTION scraper_book_search_vector();
+
+CREATE FUNCTION scraper_genre_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE scraper_book SET genre_id = genre_id WHERE genre_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER scraper_genre_search_vector
+    AFTER UPDATE OF name ON scraper_genre
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION scraper_genre_search_vector();
+
+UPDATE scraper_book SET title = title;
+
+CREATE INDEX scraper_book_search_vector_gin ON scraper_book USING gin (search_vector);
+"""
+
+DROP_SEARCH_TRIGGER = """
+DROP INDEX IF EXISTS scraper_book_search_vector_gin;
+DROP TRIGGER IF EXISTS scraper_genre_search_vector ON scraper_genre;
+DROP FUNCTION IF EXISTS scraper_genre_search_vector();
+DROP TRIGGER IF EXISTS scraper_book_search_vector ON scraper_book;
+DROP FUNCTION IF EXISTS scraper_book_search_vector();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    # SQLite dev databases search with icontains (scraper.search)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH_TRIGGER)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0017_book_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-18 20:10
+
+import warnings
+
+from django.db import migrations
+
+# icontains compiles to UPPER("column"::text) LIKE UPPER('%x%') on
+# PostgreSQL, so the trigram indexes are built over the same expression.
+# The fuzzy title option (scraper.search) matches against it too.
+TRIGRAM_INDEXES = [
+    ('scraper_book_title_trgm', 'scraper_book', 'title'),
+    ('scraper_genre_name_trgm', 'scraper_genre', 'name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        available = cursor.fetchone() is not None
+    if not available:
+        warnings.warn(
+            'pg_trgm is not available on this PostgreSQL server; substring filters '
+            'will scan the tables and ?fuzzy= falls back to icontains'
+        )
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0018_book_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
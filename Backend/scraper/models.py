@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.urls import reverse
@@ -27,6 +28,12 @@ class Book(models.Model):
     title = models.CharField(max_length=255, verbose_name='title')
     isbn = models.CharField(max_length=20, blank=True, null=True, verbose_name='ISBN')
     image = models.ImageField(upload_to='book_covers/', blank=True, null=True)
+    image_source_url = models.URLField(blank=True, null=True, verbose_name='Image source URL')
+    image_hash = models.CharField(max_length=64, blank=True, default='', verbose_name='Image SHA-256')
+    image_width = models.PositiveIntegerField(blank=True, null=True, verbose_name='Image width')
+    image_height = models.PositiveIntegerField(blank=True, null=True, verbose_name='Image height')
+    image_size = models.PositiveIntegerField(blank=True, null=True, verbose_name='Image size in bytes')
+    image_format = models.CharField(max_length=10, blank=True, default='', verbose_name='Image format')
     genre = models.ForeignKey(
         Genre, 
         on_delete=models.SET_NULL, 
@@ -50,8 +57,11 @@ class Book(models.Model):
     in_stock = models.BooleanField(default=True, verbose_name='In stock')
     availability = models.CharField(max_length=100, blank=True, verbose_name='Available')
     
-    source_url = models.URLField(blank=True, null=True, verbose_name='URL sources')
+    source_url = models.URLField(blank=True, null=True, unique=True, verbose_name='URL sources')
     last_scraped = models.DateTimeField(blank=True, null=True, verbose_name='Last update')
+    listing_hash = models.CharField(max_length=64, blank=True, default='', verbose_name='Listing fingerprint')
+    # Filled by a PostgreSQL trigger (migration 0018), stays NULL on SQLite
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -65,6 +75,8 @@ class Book(models.Model):
             models.Index(fields=['title']),
             models.Index(fields=['genre']),
             models.Index(fields=['rating']),
+            # Keyset pagination of the book lists (scraper.pagination)
+            models.Index(fields=['created_at', 'id']),
         ]
     
     def __str__(self):
@@ -77,17 +89,38 @@ class Book(models.Model):
     def rating_display(self):
         return '★' * self.rating + '☆' * (5 - self.rating)
 
+class SimilarBook(models.Model):
+    """Precomputed recommendations shown on the book page, see scraper.similarity."""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='similar_links')
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        ordering = ['book', 'rank']
+        verbose_name = 'Similar book'
+        verbose_name_plural = 'Similar books'
+        
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'rank'], name='unique_similar_book_rank'),
+        ]
+    
+    def __str__(self):
+        return f"{self.book_id} -> {self.similar_id} (#{self.rank})"
+
 class ScrapingLog(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     finished_at = models.DateTimeField(blank=True, null=True)
     total_books_found = models.IntegerField(default=0)
     books_created = models.IntegerField(default=0)
     books_updated = models.IntegerField(default=0)
+    books_unchanged = models.IntegerField(default=0)
     errors_count = models.IntegerField(default=0)
     status = models.CharField(
         max_length=20,
         choices=[
+            ('queued', 'В черзі'),
             ('running', 'Виконується'),
+            ('paused', 'Призупинено'),
             ('completed', 'Завершено'),
             ('failed', 'Помилка'),
             ('interrupted', 'Перервано')
@@ -95,6 +128,13 @@ class ScrapingLog(models.Model):
         default='running'
     )
     error_message = models.TextField(blank=True, null=True)
+    pages_completed = models.IntegerField(default=0)
+    pages_remaining = models.IntegerField(default=0)
+    images_fetched = models.IntegerField(default=0)
+    checkpoint = models.JSONField(default=dict, blank=True)
+    options = models.JSONField(default=dict, blank=True)
+    stats = models.JSONField(default=dict, blank=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
     
     class Meta:
         ordering = ['-started_at']
@@ -102,4 +142,69 @@ class ScrapingLog(models.Model):
         verbose_name_plural = 'Scraping logs'
     
     def __str__(self):
-        return f"Scraping {self.started_at.strftime('%Y-%m-%d %H:%M')} - {self.status}"
\ No newline at end of file
+        return f"Scraping {self.started_at.strftime('%Y-%m-%d %H:%M')} - {self.status}"
+
+class CrawlTask(models.Model):
+    KIND_CHOICES = [
+        ('listing', 'Listing page'),
+        ('book', 'Book page'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('leased', 'Leased'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    scraping_log = models.ForeignKey(
+        ScrapingLog,
+        on_delete=models.CASCADE,
+        related_name='crawl_tasks'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    url = models.URLField(max_length=500)
+    fingerprint = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    leased_until = models.DateTimeField(blank=True, null=True)
+    worker = models.CharField(max_length=100, blank=True, default='')
+    attempts = models.IntegerField(default=0)
+    error_message = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Crawl task'
+        verbose_name_plural = 'Crawl tasks'
+        
+        constraints = [
+            models.UniqueConstraint(fields=['scraping_log', 'url'], name='unique_crawl_task_url'),
+        ]
+        indexes = [
+            models.Index(fields=['scraping_log', 'status', 'kind']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.url} - {self.status}"
+
+
+class FrontierURL(models.Model):
+    KIND_CHOICES = CrawlTask.KIND_CHOICES
+    
+    url = models.URLField(max_length=500, unique=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    first_fetched_at = models.DateTimeField(blank=True, null=True)
+    last_fetched_at = models.DateTimeField(blank=True, null=True)
+    last_changed_at = models.DateTimeField(blank=True, null=True)
+    fetch_count = models.IntegerField(default=0)
+    change_count = models.IntegerField(default=0)
+    change_rate = models.FloatField(default=0.0, verbose_name='Estimated changes per day')
+    next_fetch_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        ordering = ['next_fetch_at']
+        verbose_name = 'Frontier URL'
+        verbose_name_plural = 'Frontier URLs'
+    
+    def __str__(self):
+        return f"{self.url} - next {self.next_fetch_at}"
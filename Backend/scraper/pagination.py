@@ -0,0 +1,144 @@
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .search import RANKINGS
+
+
+class BookCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the ``(created_at, id)`` index.
+
+    Pages are fetched with ``WHERE (created_at, id) < <cursor>`` instead of
+    an OFFSET, so a deep page costs the same as the first one. The cursor
+    holds every ordering column, not just the first one as DRF's does, so
+    books sharing a timestamp or a search rank are never repeated or
+    skipped. The exact total needs a full COUNT and is only computed for
+    ``?count=true``.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = settings.BOOK_LIST_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('true', '1', 'yes'):
+            self.count = queryset.count()
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = self.cursor.position if self.cursor else None
+
+        if reverse:
+            queryset = queryset.order_by(*(
+                order[1:] if order.startswith('-') else '-' + order for order in self.ordering
+            ))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = self.filter_after(queryset, current_position, reverse)
+
+        # The ordering ends with the unique id, so positions never repeat and
+        # the offset DRF falls back to for ties is not needed
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def filter_after(self, queryset, position, reverse):
+        """Keeps the rows past ``position`` in the (possibly reversed) ordering."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        # (a, b, c) < (x, y, z) spelled out as a < x OR (a = x AND b < y) OR ...
+        # with each column compared in its own direction
+        after = Q()
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            attr = order.lstrip('-')
+            lookup = '__lt' if order.startswith('-') != reverse else '__gt'
+            after |= Q(**equal, **{attr + lookup: value})
+            equal[attr] = value
+        # The bound on the leading column alone is what the index can range-scan
+        first = self.ordering[0]
+        bound = '__lte' if first.startswith('-') != reverse else '__gte'
+        return queryset.filter(**{first.lstrip('-') + bound: values[0]}).filter(after)
+
+    def get_ordering(self, request, queryset, view):
+        # The cursor is only cheap on the indexed key, so ?ordering= is not applied
+        for rank in RANKINGS:
+            if rank in queryset.query.annotations:
+                # Search results come best match first
+                return ('-' + rank,) + self.ordering
+        return self.ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for order in ordering:
+            attr = order.lstrip('-')
+            position.append(str(instance[attr] if isinstance(instance, dict) else getattr(instance, attr)))
+        return json.dumps(position, separators=(',', ':'))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count'] = {
+            'type': 'integer',
+            'example': 123,
+            'description': 'Only present when requested with ?count=true',
+        }
+        return schema
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Include the exact number of results',
+            'schema': {'type': 'boolean'},
+        })
+        return parameters
@@ -0,0 +1,298 @@
+import re
+from urllib.parse import urljoin
+
+import lxml.html
+from bs4 import BeautifulSoup, SoupStrainer
+
+RATING_WORDS = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
+PAGER_RE = re.compile(r'Page\s+(\d+)\s+of\s+(\d+)')
+
+
+class BaseParser:
+    """
+    Extracts book data from books.toscrape.com pages.
+
+    ``parse_listing`` returns ``{'books': [...], 'next': href, 'page': n,
+    'pages': total}`` with one dict per ``article.product_pod`` holding the
+    raw values shown on the listing page (``page``/``pages`` come from the
+    "Page 1 of 50" pager and are None when it is missing); ``parse_detail``
+    returns the book dict stored by ``scrape_books`` (without the ``url``
+    key); ``parse_categories`` returns the category index links from the
+    sidebar. Every engine must produce identical output for the same page.
+    """
+
+    name = None
+
+    def parse_listing(self, content):
+        raise NotImplementedError
+
+    def parse_categories(self, content):
+        raise NotImplementedError
+
+    def parse_detail(self, content, book_url):
+        raise NotImplementedError
+
+    def parse_price(self, price_text):
+        if not price_text:
+            return 0.0
+
+        price_clean = re.sub(r'[£$€]', '', price_text.strip())
+        try:
+            return float(price_clean)
+        except ValueError:
+            return 0.0
+
+    def parse_pager(self, pager_text):
+        match = PAGER_RE.search(pager_text or '')
+        if not match:
+            return None, None
+        return int(match.group(1)), int(match.group(2))
+    
+    def parse_rating(self, rating_class):
+        for word, rating in RATING_WORDS.items():
+            if word in rating_class:
+                return rating
+        return 0
+
+
+class SoupParser(BaseParser):
+    """BeautifulSoup engine; with ``strainer`` only the needed subtrees are built."""
+
+    LISTING_STRAINER = SoupStrainer(['article', 'ul'], class_=['product_pod', 'pager'])
+    CATEGORIES_STRAINER = SoupStrainer('div', class_='side_categories')
+    DETAIL_STRAINER = SoupStrainer(['ul', 'article'], class_=['breadcrumb', 'product_page'])
+
+    def __init__(self, features='html.parser', strainer=False):
+        self.features = features
+        self.strainer = strainer
+
+    @property
+    def name(self):
+        return 'soup-strainer' if self.strainer else 'soup'
+
+    def _soup(self, content, strainer):
+        return BeautifulSoup(
+            content,
+            self.features,
+            parse_only=strainer if self.strainer else None
+        )
+
+    def parse_listing(self, content):
+        soup = self._soup(content, self.LISTING_STRAINER)
+        books = []
+
+        for book_elem in soup.find_all('article', class_='product_pod'):
+            link_elem = book_elem.find('h3')
+            link_elem = link_elem.find('a') if link_elem else None
+            if not link_elem or not link_elem.get('href'):
+                continue
+
+            price_elem = book_elem.find('p', class_='price_color')
+            rating_elem = book_elem.find('p', class_='star-rating')
+            availability_elem = book_elem.find('p', class_='availability')
+            image_elem = book_elem.find('img')
+
+            books.append({
+                'href': link_elem['href'],
+                'title': link_elem.get('title') or link_elem.text.strip(),
+                'price': price_elem.text.strip() if price_elem else '',
+                'rating': ' '.join(rating_elem.get('class', [])) if rating_elem else '',
+                'availability': availability_elem.text.strip() if availability_elem else '',
+                'thumbnail': image_elem.get('src', '') if image_elem else '',
+            })
+
+        next_href = None
+        next_elem = soup.find('li', class_='next')
+        if next_elem and next_elem.find('a'):
+            next_href = next_elem.find('a').get('href')
+
+        current_elem = soup.find('li', class_='current')
+        page, pages = self.parse_pager(current_elem.text if current_elem else '')
+
+        return {'books': books, 'next': next_href, 'page': page, 'pages': pages}
+
+    def parse_categories(self, content):
+        soup = self._soup(content, self.CATEGORIES_STRAINER)
+        sidebar = soup.find('div', class_='side_categories')
+        if not sidebar:
+            return []
+        return [
+            link['href'] for link in sidebar.select('ul > li > ul > li > a')
+            if link.get('href')
+        ]
+
+    def parse_detail(self, content, book_url):
+        soup = self._soup(content, self.DETAIL_STRAINER)
+
+        title = soup.find('h1').text.strip()
+        product_info = {}
+        table = soup.find('table', class_='table table-striped')
+        if table:
+            for row in table.find_all('tr'):
+                cells = row.find_all('td')
+                if len(cells) == 2:
+                    product_info[cells[0].text.strip()] = cells[1].text.strip()
+
+        price_elem = soup.find('p', class_='price_color')
+        rating_elem = soup.find('p', class_='star-rating')
+        rating = 0
+        if rating_elem:
+            rating = self.parse_rating(' '.join(rating_elem.get('class', [])))
+
+        description = ''
+        description_elem = soup.find('div', id='product_description')
+        if description_elem:
+            desc_p = description_elem.find_next_sibling('p')
+            if desc_p:
+                description = desc_p.text.strip()
+
+        genre = 'General'
+        breadcrumb = soup.find('ul', class_='breadcrumb')
+        if breadcrumb:
+            links = breadcrumb.find_all('a')
+            if len(links) >= 3:
+                genre = links[2].text.strip()
+
+        image_url = None
+        image_elem = soup.find('div', class_='item active')
+        if image_elem:
+            img_tag = image_elem.find('img')
+            if img_tag and img_tag.get('src'):
+                image_url = urljoin(book_url, img_tag['src'])
+
+        return {
+            'title': title,
+            'isbn': product_info.get('ISBN', ''),
+            'genre': genre,
+            'price': self.parse_price(price_elem.text if price_elem else '0'),
+            'rating': rating,
+            'description': description,
+            'in_stock': soup.find('p', class_='instock availability') is not None,
+            'availability': product_info.get('Availability', ''),
+            'image_url': image_url,
+        }
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlParser(BaseParser):
+    """lxml engine using precompiled XPath expressions."""
+
+    name = 'lxml'
+
+    PRODUCT_PODS = lxml.etree.XPath(f"//article[{_has_class('product_pod')}]")
+    POD_LINK = lxml.etree.XPath('.//h3//a')
+    POD_PRICE = lxml.etree.XPath(f".//p[{_has_class('price_color')}]")
+    POD_RATING = lxml.etree.XPath(f".//p[{_has_class('star-rating')}]")
+    POD_AVAILABILITY = lxml.etree.XPath(f".//p[{_has_class('availability')}]")
+    POD_IMAGE = lxml.etree.XPath('.//img')
+    NEXT_PAGE = lxml.etree.XPath(f"(//li[{_has_class('next')}])[1]//a/@href")
+    CURRENT_PAGE = lxml.etree.XPath(f"(//li[{_has_class('current')}])[1]")
+    CATEGORY_LINKS = lxml.etree.XPath(
+        f"(//div[{_has_class('side_categories')}])[1]//ul/li/ul/li/a/@href"
+    )
+
+    TITLE = lxml.etree.XPath('//h1')
+    INFO_ROWS = lxml.etree.XPath("(//table[@class='table table-striped'])[1]//tr")
+    PRICE = lxml.etree.XPath(f"//p[{_has_class('price_color')}]")
+    RATING = lxml.etree.XPath(f"//p[{_has_class('star-rating')}]")
+    DESCRIPTION = lxml.etree.XPath("(//div[@id='product_description'])[1]/following-sibling::p[1]")
+    IN_STOCK = lxml.etree.XPath("//p[@class='instock availability']")
+    BREADCRUMB_LINKS = lxml.etree.XPath(f"(//ul[{_has_class('breadcrumb')}])[1]//a")
+    IMAGE = lxml.etree.XPath("(//div[@class='item active'])[1]//img")
+
+    def __init__(self, encoding='utf-8'):
+        self.html_parser = lxml.html.HTMLParser(encoding=encoding)
+
+    def _tree(self, content):
+        return lxml.html.document_fromstring(content, parser=self.html_parser)
+
+    def _text(self, elements):
+        return elements[0].text_content().strip() if elements else ''
+
+    def _classes(self, element):
+        return ' '.join(element.get('class', '').split())
+
+    def parse_listing(self, content):
+        tree = self._tree(content)
+        books = []
+
+        for book_elem in self.PRODUCT_PODS(tree):
+            links = self.POD_LINK(book_elem)
+            if not links or not links[0].get('href'):
+                continue
+
+            rating = self.POD_RATING(book_elem)
+            image = self.POD_IMAGE(book_elem)
+
+            books.append({
+                'href': links[0].get('href'),
+                'title': links[0].get('title') or links[0].text_content().strip(),
+                'price': self._text(self.POD_PRICE(book_elem)),
+                'rating': self._classes(rating[0]) if rating else '',
+                'availability': self._text(self.POD_AVAILABILITY(book_elem)),
+                'thumbnail': image[0].get('src', '') if image else '',
+            })
+
+        next_href = self.NEXT_PAGE(tree)
+        page, pages = self.parse_pager(self._text(self.CURRENT_PAGE(tree)))
+        return {
+            'books': books,
+            'next': next_href[0] if next_href else None,
+            'page': page,
+            'pages': pages,
+        }
+
+    def parse_categories(self, content):
+        return [str(href) for href in self.CATEGORY_LINKS(self._tree(content)) if href]
+
+    def parse_detail(self, content, book_url):
+        tree = self._tree(content)
+
+        titles = self.TITLE(tree)
+        if not titles:
+            raise ValueError('No title on the page')
+
+        product_info = {}
+        for row in self.INFO_ROWS(tree):
+            cells = row.findall('.//td')
+            if len(cells) == 2:
+                product_info[cells[0].text_content().strip()] = cells[1].text_content().strip()
+
+        price = self.PRICE(tree)
+        rating = self.RATING(tree)
+
+        genre = 'General'
+        links = self.BREADCRUMB_LINKS(tree)
+        if len(links) >= 3:
+            genre = links[2].text_content().strip()
+
+        image_url = None
+        images = self.IMAGE(tree)
+        if images and images[0].get('src'):
+            image_url = urljoin(book_url, images[0].get('src'))
+
+        return {
+            'title': titles[0].text_content().strip(),
+            'isbn': product_info.get('ISBN', ''),
+            'genre': genre,
+            'price': self.parse_price(price[0].text_content() if price else '0'),
+            'rating': self.parse_rating(self._classes(rating[0])) if rating else 0,
+            'description': self._text(self.DESCRIPTION(tree)),
+            'in_stock': bool(self.IN_STOCK(tree)),
+            'availability': product_info.get('Availability', ''),
+            'image_url': image_url,
+        }
+
+
+PARSERS = {
+    'lxml': LxmlParser,
+    'soup': SoupParser,
+    'soup-strainer': lambda: SoupParser(features='lxml', strainer=True),
+}
+
+
+def get_parser(name):
+    return PARSERS[name]()
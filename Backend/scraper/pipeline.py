@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+# Yielded by BookPipeline when no item arrived within ``idle_timeout``, so the
+# consumer gets a chance to run periodic work while the producer is busy.
+IDLE = object()
+
+# Emitted by BookScraper.iter_books after all books of a listing page, with
+# the pages still left to crawl at that point and an estimate of how many
+# listing pages that frontier expands to.
+PageDone = namedtuple('PageDone', ['url', 'pending', 'failed', 'remaining'])
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class BookPipeline:
+    """
+    Runs a producer generator in a background thread and hands its items to
+    the consumer through a bounded queue.
+
+    The producer blocks once ``maxsize`` items are waiting, so at most
+    ``maxsize`` scraped books (plus the consumer's current batch) are held in
+    memory at any time. Exceptions raised by the producer are re-raised in
+    the consuming thread.
+    """
+
+    def __init__(self, source, maxsize=100, idle_timeout=None):
+        self.source = source
+        self.idle_timeout = idle_timeout
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for item in self.source:
+                if not self._put(item):
+                    return
+        except BaseException as e:
+            self._put(_Failure(e))
+            return
+        self._put(_DONE)
+
+    def __iter__(self):
+        self._thread.start()
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    yield IDLE
+                    continue
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            self._stop.set()
+
+
+class CrawlControl:
+    """
+    Cancellation and pause flags shared by the crawl threads.
+
+    Workers call ``wait`` at page and book boundaries: it blocks while the
+    crawl is paused and returns False once it has been cancelled.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def cancel(self):
+        self.cancelled.set()
+        self._running.set()
+
+    def pause(self):
+        if not self.cancelled.is_set():
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def wait(self):
+        self._running.wait()
+        return not self.cancelled.is_set()
+
+
+class ImageStage:
+    """
+    Downloads covers on a dedicated worker pool so that image requests never
+    hold up HTML parsing.
+
+    ``submit`` blocks once ``maxsize`` jobs are pending, which keeps the
+    stage bounded like ``BookPipeline``. Finished results are collected in a
+    queue and handed back to the writer thread by ``drain``.
+    """
+
+    def __init__(self, handler, workers=4, maxsize=100):
+        self.handler = handler
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._results = queue.Queue()
+
+    def submit(self, job):
+        self._slots.acquire()
+        self.executor.submit(self._run, job)
+
+    def _run(self, job):
+        try:
+            result = self.handler(job)
+            if result is not None:
+                self._results.put(result)
+        except Exception as e:
+            logger.error(f"Image stage error: {e}")
+        finally:
+            self._slots.release()
+
+    def drain(self):
+        results = []
+        while True:
+            try:
+                results.append(self._results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        return self.drain()
@@ -0,0 +1,409 @@
+import hashlib
+import html
+import io
+import mimetypes
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from PIL import Image
+
+GENRES = [
+    'Travel', 'Mystery', 'Historical Fiction', 'Sequential Art', 'Classics',
+    'Philosophy', 'Romance', 'Fiction', 'Poetry', 'Science Fiction',
+]
+RATING_WORDS = ['One', 'Two', 'Three', 'Four', 'Five']
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en-us" class="no-js">
+    <head>
+        <title>{title} | Books to Scrape - Sandbox</title>
+        <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+    </head>
+    <body id="default" class="default">
+        <header class="header container-fluid">
+            <div class="page_inner"><div class="row">
+                <div class="col-sm-8 h1"><a href="{root}index.html">Books to Scrape</a><small> We love being scraped!</small></div>
+            </div></div>
+        </header>
+        <div class="container-fluid page">
+            <div class="page_inner">
+                <ul class="breadcrumb">{breadcrumb}</ul>
+{body}
+            </div>
+        </div>
+    </body>
+</html>
+"""
+
+LISTING_TEMPLATE = """                <div class="row">
+                    <aside class="sidebar col-sm-4 col-md-3">
+                        <div class="side_categories">
+                            <ul class="nav nav-list">
+                                <li>
+                                    <a href="{root}catalogue/category/books_1/index.html">Books</a>
+                                    <ul>{categories}</ul>
+                                </li>
+                            </ul>
+                        </div>
+                    </aside>
+                    <div class="col-sm-8 col-md-9">
+                        <div class="page-header action"><h1>{title}</h1></div>
+                        <section>
+                            <ol class="row">{pods}</ol>
+                            <div><ul class="pager"><li class="current">Page {page} of {pages}</li>{next}</ul></div>
+                        </section>
+                    </div>
+                </div>"""
+
+POD_TEMPLATE = """
+                                <li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+                                    <article class="product_pod">
+                                        <div class="image_container">
+                                            <a href="{href}"><img src="{thumbnail}" alt="{title}" class="thumbnail"></a>
+                                        </div>
+                                        <p class="star-rating {rating}">
+                                            <i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i>
+                                        </p>
+                                        <h3><a href="{href}" title="{title}">{title}</a></h3>
+                                        <div class="product_price">
+                                            <p class="price_color">£{price}</p>
+                                            <p class="instock availability">
+                                                <i class="icon-ok"></i>
+                                                    In stock
+                                            </p>
+                                        </div>
+                                    </article>
+                                </li>"""
+
+DETAIL_TEMPLATE = """                <div class="content"><div id="content_inner">
+                    <article class="product_page">
+                        <div class="row">
+                            <div class="col-sm-6">
+                                <div id="product_gallery" class="carousel"><div class="thumbnail"><div class="carousel-inner">
+                                    <div class="item active"><img src="{image}" alt="{title}" /></div>
+                                </div></div></div>
+                            </div>
+                            <div class="col-sm-6 product_main">
+                                <h1>{title}</h1>
+                                <p class="price_color">£{price}</p>
+                                <p class="instock availability">
+                                    <i class="icon-ok"></i>
+                                        In stock ({stock} available)
+                                </p>
+                                <p class="star-rating {rating}">
+                                    <i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i>
+                                </p>
+                            </div>
+                        </div>
+                        <div id="product_description" class="sub-header"><h2>Product Description</h2></div>
+                        <p>{description}</p>
+                        <div class="sub-header"><h2>Product Information</h2></div>
+                        <table class="table table-striped">
+                            <tr><th>UPC</th><td>{upc}</td></tr>
+                            <tr><th>Product Type</th><td>Books</td></tr>
+                            <tr><th>Price (excl. tax)</th><td>£{price}</td></tr>
+                            <tr><th>Availability</th><td>In stock ({stock} available)</td></tr>
+                            <tr><th>Number of reviews</th><td>0</td></tr>
+                        </table>
+                    </article>
+                </div></div>"""
+
+
+class FixtureCatalog:
+    """
+    Deterministic books.toscrape.com look-alike rendered on demand.
+
+    Serves ``catalogue/page-N.html`` listings, per-genre category indexes,
+    book detail pages and JPEG covers using the same markup as the real
+    site, so ``BookScraper`` can be exercised end to end without network.
+    """
+
+    def __init__(self, pages=5, per_page=20, seed=0, image_size=(120, 180)):
+        self.pages = pages
+        self.per_page = per_page
+        self.seed = seed
+        self.image_size = image_size
+
+    @property
+    def books_count(self):
+        return self.pages * self.per_page
+
+    def book(self, number):
+        rng = random.Random(f'{self.seed}:{number}')
+        genre_id = rng.randrange(len(GENRES))
+        slug = f'replay-book-{number}_{number}'
+        cover = hashlib.md5(f'{self.seed}:{number}'.encode()).hexdigest()
+        return {
+            'number': number,
+            'slug': slug,
+            'title': f'Replay Book {number}',
+            'price': f'{rng.uniform(10, 60):.2f}',
+            'rating': RATING_WORDS[rng.randrange(5)],
+            'stock': rng.randint(1, 22),
+            'genre_id': genre_id,
+            'cover': f'media/cache/{cover[:2]}/{cover[2:4]}/{cover}.jpg',
+            'description': ' '.join(
+                rng.choice(['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'book', 'story'])
+                for _ in range(120)
+            ),
+        }
+
+    def genre_slug(self, genre_id):
+        return f"{GENRES[genre_id].lower().replace(' ', '-')}_{genre_id + 2}"
+
+    def render(self, path):
+        path = path.lstrip('/')
+        if path.startswith('catalogue/page-') and path.endswith('.html'):
+            page = self._int(path[len('catalogue/page-'):-len('.html')])
+            if page and page <= self.pages:
+                return 'text/html; charset=utf-8', self.render_listing(page)
+        elif path.startswith('catalogue/category/books/'):
+            genre_id = self._int(path.split('/')[3].rsplit('_', 1)[-1])
+            if genre_id is not None and 0 <= genre_id - 2 < len(GENRES) and path.endswith('index.html'):
+                return 'text/html; charset=utf-8', self.render_category(genre_id - 2)
+        elif path.startswith('catalogue/replay-book-') and path.endswith('/index.html'):
+            number = self._int(path.split('/')[1].rsplit('_', 1)[-1])
+            if number and number <= self.books_count:
+                return 'text/html; charset=utf-8', self.render_detail(number)
+        elif path.startswith('media/cache/') and path.endswith('.jpg'):
+            return 'image/jpeg', self.render_image(path)
+        return None
+
+    def _int(self, value):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    def _categories(self, root):
+        return ''.join(
+            f'<li><a href="{root}catalogue/category/books/{self.genre_slug(genre_id)}/index.html">'
+            f'{genre}</a></li>'
+            for genre_id, genre in enumerate(GENRES)
+        )
+
+    def _pod(self, book, href_prefix, root):
+        return POD_TEMPLATE.format(
+            href=f"{href_prefix}{book['slug']}/index.html",
+            thumbnail=f"{root}{book['cover']}",
+            title=html.escape(book['title']),
+            rating=book['rating'],
+            price=book['price'],
+        )
+
+    def _page(self, title, root, breadcrumb, body):
+        return PAGE_TEMPLATE.format(
+            title=html.escape(title),
+            root=root,
+            breadcrumb=breadcrumb,
+            body=body,
+        ).encode('utf-8')
+
+    def render_listing(self, page):
+        first = (page - 1) * self.per_page + 1
+        pods = ''.join(
+            self._pod(self.book(number), '', '../')
+            for number in range(first, first + self.per_page)
+        )
+        next_link = f'<li class="next"><a href="page-{page + 1}.html">next</a></li>' if page < self.pages else ''
+        body = LISTING_TEMPLATE.format(
+            root='../',
+            categories=self._categories('../'),
+            title='All products',
+            pods=pods,
+            page=page,
+            pages=self.pages,
+            next=next_link,
+        )
+        breadcrumb = '<li><a href="../index.html">Home</a></li><li class="active">All products</li>'
+        return self._page('All products', '../', breadcrumb, body)
+
+    def render_category(self, genre_id):
+        root = '../../../../'
+        books = [
+            self.book(number) for number in range(1, self.books_count + 1)
+            if self.book(number)['genre_id'] == genre_id
+        ]
+        body = LISTING_TEMPLATE.format(
+            root=root,
+            categories=self._categories(root),
+            title=GENRES[genre_id],
+            pods=''.join(self._pod(book, '../../../', root) for book in books),
+            page=1,
+            pages=1,
+            next='',
+        )
+        breadcrumb = (
+            f'<li><a href="{root}index.html">Home</a></li>'
+            f'<li><a href="../../books_1/index.html">Books</a></li>'
+            f'<li class="active">{GENRES[genre_id]}</li>'
+        )
+        return self._page(GENRES[genre_id], root, breadcrumb, body)
+
+    def render_detail(self, number):
+        book = self.book(number)
+        root = '../../'
+        body = DETAIL_TEMPLATE.format(
+            image=f"{root}{book['cover']}",
+            title=html.escape(book['title']),
+            price=book['price'],
+            stock=book['stock'],
+            rating=book['rating'],
+            description=book['description'],
+            upc=hashlib.md5(book['slug'].encode()).hexdigest()[:16],
+        )
+        breadcrumb = (
+            f'<li><a href="{root}index.html">Home</a></li>'
+            f'<li><a href="../category/books_1/index.html">Books</a></li>'
+            f'<li><a href="../category/books/{self.genre_slug(book["genre_id"])}/index.html">'
+            f'{GENRES[book["genre_id"]]}</a></li>'
+            f'<li class="active">{html.escape(book["title"])}</li>'
+        )
+        return self._page(book['title'], root, breadcrumb, body)
+
+    def render_image(self, path):
+        width, height = self.image_size
+        rng = random.Random(path)
+        image = Image.frombytes('L', (width, height), rng.randbytes(width * height))
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, 'JPEG', quality=75)
+        return buffer.getvalue()
+
+
+class RecordedResponses:
+    """Serves response bodies saved by ``ResponseRecorder`` from a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def render(self, path):
+        relative = path.lstrip('/') or 'index.html'
+        full_path = os.path.normpath(os.path.join(self.directory, relative))
+        if not full_path.startswith(os.path.abspath(self.directory)) or not os.path.isfile(full_path):
+            return None
+
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        with open(full_path, 'rb') as body:
+            return content_type, body.read()
+
+
+class ResponseRecorder:
+    """Saves every successful ``BookScraper`` response under ``directory`` by URL path."""
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+
+    def save(self, url, response):
+        relative = urlparse(url).path.lstrip('/')
+        if not relative or relative.endswith('/'):
+            relative += 'index.html'
+
+        full_path = os.path.normpath(os.path.join(self.directory, relative))
+        if not full_path.startswith(self.directory):
+            return
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as body:
+            body.write(response.content)
+
+
+class ReplayServer:
+    """
+    Local HTTP server replaying a catalog with optional injected latency and
+    errors.
+
+    ``source`` is anything with a ``render(path)`` method returning
+    ``(content_type, body)`` or ``None``. Each request sleeps ``latency``
+    seconds (plus up to ``jitter``) and fails with a 503 with probability
+    ``error_rate``. Responses carry an ETag and honour ``If-None-Match``;
+    ``not_modified`` counts the 304s sent.
+    """
+
+    def __init__(self, source, latency=0.0, jitter=0.0, error_rate=0.0, seed=0,
+                 host='127.0.0.1', port=0):
+        self.source = source
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def _handler_class(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                replay.handle(self)
+
+        return Handler
+
+    def handle(self, request):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+
+        if delay:
+            time.sleep(delay)
+        if fail:
+            request.send_error(503, 'Injected error')
+            return
+
+        rendered = self.source.render(urlparse(request.path).path)
+        if rendered is None:
+            request.send_error(404)
+            return
+
+        content_type, body = rendered
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if request.headers.get('If-None-Match') == etag:
+            request.send_response(304)
+            request.send_header('ETag', etag)
+            request.end_headers()
+            with self._lock:
+                self.not_modified += 1
+            return
+
+        request.send_response(200)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(body)))
+        request.send_header('ETag', etag)
+        request.end_headers()
+        request.wfile.write(body)
+        with self._lock:
+            self.bytes_sent += len(body)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
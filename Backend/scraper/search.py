@@ -0,0 +1,81 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Upper
+
+# Text search configuration of the search_vector trigger (migration 0018).
+# 'simple' only lowercases, so Ukrainian and English titles tokenize alike.
+SEARCH_CONFIG = 'simple'
+SEARCH_RANK = 'search_rank'
+TITLE_SIMILARITY = 'title_similarity'
+# Relevance annotations the book list pagination orders by, strongest first
+RANKINGS = (SEARCH_RANK, TITLE_SIMILARITY)
+
+TERM_RE = re.compile(r'\w+')
+
+_trigram_support = {}
+
+
+def search_books(queryset, value):
+    """
+    Filters books matching every word of ``value`` as a prefix in the title,
+    genre name or description.
+
+    On PostgreSQL the match runs against the GIN-indexed ``search_vector``
+    and the books get a ``search_rank`` annotation (ts_rank, title > genre >
+    description), which the book list pagination orders by. Other databases
+    fall back to an unranked icontains scan.
+    """
+    terms = TERM_RE.findall(value.lower())
+    if not terms or connections[queryset.db].vendor != 'postgresql':
+        return queryset.filter(
+            Q(title__icontains=value) |
+            Q(description__icontains=value) |
+            Q(genre__name__icontains=value)
+        )
+
+    query = SearchQuery(
+        ' & '.join(f'{term}:*' for term in terms),
+        config=SEARCH_CONFIG,
+        search_type='raw',
+    )
+    # ts_rank is a float4; as a double the rank survives the round trip
+    # through the pagination cursor exactly
+    rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+    return queryset.filter(search_vector=query).annotate(**{SEARCH_RANK: rank})
+
+
+def has_trigram(alias):
+    """Whether pg_trgm is installed in the ``alias`` database (checked once)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return False
+    if alias not in _trigram_support:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_support[alias] = cursor.fetchone() is not None
+    return _trigram_support[alias]
+
+
+def filter_title(queryset, value, fuzzy=False):
+    """
+    Filters books whose title contains ``value``, served by the trigram
+    index of migration 0019.
+
+    With ``fuzzy`` the title only has to contain a close match of ``value``
+    (pg_trgm word similarity, so "hary poter" finds "Harry Potter"), and the
+    books get a ``title_similarity`` annotation to order by. Without pg_trgm
+    fuzzy falls back to the exact substring match.
+    """
+    if not fuzzy or not has_trigram(queryset.db):
+        return queryset.filter(title__icontains=value)
+
+    # Upper() keeps the match on the indexed expression; pg_trgm ignores case
+    similarity = Cast(TrigramWordSimilarity(value, Upper('title')), FloatField())
+    return (
+        queryset.alias(upper_title=Upper('title'))
+        .filter(upper_title__trigram_word_similar=value)
+        .annotate(**{TITLE_SIMILARITY: similarity})
+    )
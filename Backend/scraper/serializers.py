@@ -1,25 +1,55 @@
+import hashlib
 import os
 
+from django.utils import timezone
 from rest_framework import serializers
+from .image_store import IMAGE_INFO_FIELDS, describe_image
 from .models import ScrapingLog, Book, Genre
 
 class ScrapingLogSerializer(serializers.ModelSerializer):
     duration = serializers.SerializerMethodField()
+    pages_per_minute = serializers.SerializerMethodField()
+    books_per_minute = serializers.SerializerMethodField()
+    eta_seconds = serializers.SerializerMethodField()
     
     class Meta:
         model = ScrapingLog
         fields = [
             'id', 'started_at', 'finished_at', 'duration',
-            'total_books_found', 'books_created', 'books_updated',
-            'errors_count', 'status', 'error_message'
+            'total_books_found', 'books_created', 'books_updated', 'books_unchanged',
+            'pages_completed', 'pages_remaining', 'images_fetched',
+            'errors_count', 'pages_per_minute', 'books_per_minute', 'eta_seconds',
+            'status', 'error_message', 'options', 'stats', 'heartbeat_at'
         ]
-        read_only_fields = ['id', 'started_at']
+        read_only_fields = ['id', 'started_at', 'options', 'stats', 'heartbeat_at']
     
     def get_duration(self, obj):
         if obj.finished_at and obj.started_at:
             duration = obj.finished_at - obj.started_at
             return str(duration)
         return None
+    
+    def _elapsed_minutes(self, obj):
+        if not obj.started_at or obj.status == 'queued':
+            return None
+        minutes = ((obj.finished_at or timezone.now()) - obj.started_at).total_seconds() / 60
+        return minutes if minutes > 0 else None
+    
+    def get_pages_per_minute(self, obj):
+        minutes = self._elapsed_minutes(obj)
+        return round(obj.pages_completed / minutes, 2) if minutes else None
+    
+    def get_books_per_minute(self, obj):
+        minutes = self._elapsed_minutes(obj)
+        return round(obj.total_books_found / minutes, 2) if minutes else None
+    
+    def get_eta_seconds(self, obj):
+        if obj.status not in ('running', 'paused'):
+            return None
+        pages_per_minute = self.get_pages_per_minute(obj)
+        if not pages_per_minute:
+            return None
+        return round(obj.pages_remaining / pages_per_minute * 60)
 
 class GenreSerializer(serializers.ModelSerializer):
     books_count = serializers.SerializerMethodField()
@@ -29,7 +59,11 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'books_count', 'created_at']
     
     def get_books_count(self, obj):
-        return obj.book_set.count()
+        # List views pass the counts of the genres on the page, computed in one query
+        counts = self.context.get('genre_books_counts')
+        if counts is None:
+            return obj.book_set.count()
+        return counts.get(obj.id, 0)
 
 class GenreDetailSerializer(serializers.ModelSerializer):
     books_count = serializers.SerializerMethodField()
@@ -68,6 +102,35 @@ class BookSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
     
+    def validate_source_url(self, value):
+        return value or None
+    
+    def _with_image_info(self, validated_data):
+        # Read the upload once here so responses never need to stat the stored file
+        if 'image' not in validated_data:
+            return validated_data
+        image = validated_data['image']
+        if image:
+            image.seek(0)
+            content = image.read()
+            image.seek(0)
+            validated_data.update(describe_image(content))
+            validated_data['image_hash'] = hashlib.sha256(content).hexdigest()
+        else:
+            validated_data.update(dict.fromkeys(IMAGE_INFO_FIELDS))
+            validated_data['image_format'] = ''
+            validated_data['image_hash'] = ''
+        # The cover no longer comes from the scraped URL, so the next scrape
+        # must not take this file for that URL's cached download
+        validated_data['image_source_url'] = None
+        return validated_data
+    
+    def create(self, validated_data):
+        return super().create(self._with_image_info(validated_data))
+    
+    def update(self, instance, validated_data):
+        return super().update(instance, self._with_image_info(validated_data))
+    
     def get_image_url(self, obj):
         if obj.image and hasattr(obj.image, 'url'):
             return obj.image.url
@@ -91,30 +154,19 @@ class BookSerializer(serializers.ModelSerializer):
                 'path': None
             }
         
-        try:
-            file_size = obj.image.size if hasattr(obj.image, 'size') else None
-            if not file_size and hasattr(obj.image, 'path') and os.path.exists(obj.image.path):
-                file_size = os.path.getsize(obj.image.path)
-            
-            filename = os.path.basename(obj.image.name)
-            extension = os.path.splitext(filename)[1].lower()
-            
-            return {
-                'has_image': True,
-                'filename': filename,
-                'size': file_size,
-                'size_human': self._format_file_size(file_size) if file_size else None,
-                'extension': extension,
-                'path': obj.image.name
-            }
-        except Exception:
-            return {
-                'has_image': True,
-                'filename': obj.image.name,
-                'size': None,
-                'extension': None,
-                'path': obj.image.name
-            }
+        filename = os.path.basename(obj.image.name)
+        return {
+            'has_image': True,
+            'filename': filename,
+            'size': obj.image_size,
+            'size_human': self._format_file_size(obj.image_size) if obj.image_size else None,
+            'extension': os.path.splitext(filename)[1].lower(),
+            'path': obj.image.name,
+            'width': obj.image_width,
+            'height': obj.image_height,
+            'format': obj.image_format or None,
+            'content_hash': obj.image_hash or None
+        }
     
     def _format_file_size(self, size_bytes):
         if size_bytes == 0:
@@ -134,17 +186,14 @@ class BookSerializer(serializers.ModelSerializer):
         data['rating_stars'] = "★" * instance.rating + "☆" * (5 - instance.rating)
 
         if instance.genre:
-            similar_books = Book.objects.filter(
-                genre=instance.genre
-            ).exclude(id=instance.id)[:3]
-            
+            # Precomputed by scraper.similarity; the detail view prefetches them
             data['similar_books'] = [
                 {
-                    'id': book.id,
-                    'title': book.title,
-                    'image_url': book.image.url if book.image else None
+                    'id': link.similar.id,
+                    'title': link.similar.title,
+                    'image_url': link.similar.image.url if link.similar.image else None
                 }
-                for book in similar_books
+                for link in instance.similar_links.all()
             ]
         
         return data
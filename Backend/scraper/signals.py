@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .catalog_cache import bump_catalog_version
+from .models import Book, Genre
+from .similarity import rebuild_similar_books
+
+# Writes through the API, the Django admin or the shell keep the similar
+# books and the cached catalog responses current. Bulk writes send no
+# signals: scrape_books rebuilds and invalidates for its batches itself.
+
+
+@receiver(pre_save, sender=Book)
+def remember_stored_genre(sender, instance, raw=False, **kwargs):
+    instance._stored_genre_id = None
+    if not raw and not instance._state.adding:
+        instance._stored_genre_id = (
+            Book.objects.filter(pk=instance.pk).values_list('genre_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # A book moved to another genre has to leave the old genre's ranking too
+    genre_ids = {instance.genre_id, getattr(instance, '_stored_genre_id', None)}
+    transaction.on_commit(lambda: rebuild_similar_books(genre_ids))
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_delete, sender=Genre)
+def genre_deleted(sender, instance, **kwargs):
+    # Its books are left without a genre, and so without similar books
+    genre_id = instance.id
+    transaction.on_commit(lambda: rebuild_similar_books([genre_id]))
+    transaction.on_commit(bump_catalog_version)
@@ -0,0 +1,100 @@
+import bisect
+import heapq
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Book, SimilarBook
+
+SIMILAR_BOOKS = 3
+
+
+def _nearest_by_price(band, prices, price, limit, exclude):
+    """
+    The ``limit`` books of ``band`` closest in price on each side of
+    ``price``, leaving out ``exclude``. ``band`` holds ``(price, id)`` tuples
+    sorted ascending and ``prices`` the same prices, for bisecting.
+    """
+    split = bisect.bisect_left(prices, price)
+    above = [item for item in band[split:split + limit + 1] if item[1] != exclude][:limit]
+    
+    # Below the split the closest price comes last; walk it down one price
+    # level at a time and take the lowest ids of each level first
+    below = []
+    end = split
+    while end and len(below) < limit:
+        start = bisect.bisect_left(prices, prices[end - 1], 0, end)
+        below.extend(band[start:min(end, start + limit - len(below))])
+        end = start
+    return above + below
+
+
+def rank_similar(books, limit=SIMILAR_BOOKS):
+    """
+    Picks the ``limit`` most similar books for each of ``books``, given as
+    ``(id, rating, price)`` tuples of one genre: closest rating first, then
+    closest price, then lowest id, so the result never depends on row order.
+
+    Books are split into rating bands sorted by price. For each book the
+    bands are visited by rating distance and only the ``limit`` nearest
+    prices on either side of its own are taken from a band, so ranking a
+    genre costs O(n log n) instead of comparing every pair.
+    """
+    bands = defaultdict(list)
+    for book_id, rating, price in books:
+        bands[rating].append((price, book_id))
+    for band in bands.values():
+        band.sort()
+    prices = {rating: [price for price, _ in band] for rating, band in bands.items()}
+    band_order = {
+        rating: sorted(bands, key=lambda other: abs(other - rating))
+        for rating in bands
+    }
+    
+    similar = {}
+    for book_id, rating, price in books:
+        candidates = []
+        for band_rating in band_order[rating]:
+            distance = abs(band_rating - rating)
+            # Bands further away can't beat ``limit`` books already found
+            if len(candidates) >= limit and distance > candidates[-1][0]:
+                break
+            candidates.extend(
+                (distance, abs(other_price - price), other_id)
+                for other_price, other_id in _nearest_by_price(
+                    bands[band_rating], prices[band_rating], price, limit, book_id
+                )
+            )
+        similar[book_id] = [other_id for _, _, other_id in heapq.nsmallest(limit, candidates)]
+    return similar
+
+
+def rebuild_similar_books(genre_ids=None, limit=SIMILAR_BOOKS):
+    """
+    Recomputes the similar books of the given genres (all genres by default)
+    and returns the number of links written.
+    """
+    books = Book.objects.filter(genre__isnull=False).order_by()
+    stale = SimilarBook.objects.all()
+    if genre_ids is not None:
+        genre_ids = [genre_id for genre_id in genre_ids if genre_id is not None]
+        if not genre_ids:
+            return 0
+        books = books.filter(genre_id__in=genre_ids)
+        stale = stale.filter(Q(book__genre_id__in=genre_ids) | Q(book__genre__isnull=True))
+    
+    by_genre = defaultdict(list)
+    for book_id, genre_id, rating, price in books.values_list('id', 'genre_id', 'rating', 'price'):
+        by_genre[genre_id].append((book_id, rating, price))
+    
+    links = [
+        SimilarBook(book_id=book_id, similar_id=similar_id, rank=rank)
+        for genre_books in by_genre.values()
+        for book_id, similar_ids in rank_similar(genre_books, limit).items()
+        for rank, similar_id in enumerate(similar_ids, start=1)
+    ]
+    with transaction.atomic():
+        stale.delete()
+        SimilarBook.objects.bulk_create(links, batch_size=1000)
+    return len(links)
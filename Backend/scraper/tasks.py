@@ -1,16 +1,83 @@
-from celery import shared_task
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import ScrapingLog, Book, Genre
-from .management.commands.scrape_books import BookScraper
+from .models import ScrapingLog
 import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True)
-def scrape_books_task(self, pages_limit=None):
+ACTIVE_STATUSES = ['queued', 'running', 'paused']
+# Seconds without a heartbeat after which a running or paused job is taken
+# for dead; scrape_books beats every Command.HEARTBEAT_INTERVAL seconds
+HEARTBEAT_TIMEOUT = 300
+
+
+def enqueue_scraping(**options):
+    """
+    Queues a scraping job. ``options`` are passed to ``scrape_books`` by the
+    worker (``python manage.py run_scrape_worker``) that picks the job up.
+    """
+    return ScrapingLog.objects.create(status='queued', options=options)
+
+
+def claim_next_scraping():
+    """
+    Marks the oldest queued job as running and returns it, or None.
+
+    The row is locked with SKIP LOCKED, so several workers never claim the
+    same job.
+    """
+    with transaction.atomic():
+        scraping_log = (
+            ScrapingLog.objects.select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .order_by('started_at', 'id')
+            .first()
+        )
+        if scraping_log is None:
+            return None
+
+        scraping_log.status = 'running'
+        scraping_log.save(update_fields=['status'])
+    return scraping_log
+
+
+def reclaim_stale_scrapings(timeout=HEARTBEAT_TIMEOUT):
     """
-    Celery завдання для скрапінгу книг
+    Marks running and paused jobs whose process stopped sending heartbeats
+    (it died or hung) as interrupted and returns how many there were.
+
+    Like an expired crawl task lease, this frees the job's slot: a new job
+    can be started, and the checkpoint is kept for ``--resume``. A process
+    that was only hung sees the status on its next control poll and stops.
     """
-    # Створення запису про початок скрапінгу
-    scraping_log = ScrapingLog.objects.create(
-        status='running'
\ No newline at end of file
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return ScrapingLog.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status__in=['running', 'paused']
+    ).update(
+        status='interrupted',
+        error_message='The scraping process stopped sending heartbeats',
+        finished_at=timezone.now()
+    )
+
+
+def run_scraping(scraping_log, stdout=None):
+    logger.info(f"Running scraping {scraping_log.id} with {scraping_log.options}")
+    try:
+        call_command(
+            'scrape_books',
+            log_id=scraping_log.id,
+            stdout=stdout,
+            **scraping_log.options
+        )
+    except Exception as e:
+        logger.error(f"Scraping {scraping_log.id} failed: {e}")
+        ScrapingLog.objects.filter(pk=scraping_log.pk).update(
+            status='failed',
+            error_message=str(e),
+            finished_at=timezone.now()
+        )
@@ -1,3 +1,1181 @@
-from django.test import TestCase
+import json
+import os
+import pstats
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, FloatField, Value
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import crawl_queue, frontier
+from .catalog_cache import bump_catalog_version
+from .http_cache import ResponseCache
+from .image_store import ImageStore
+from .management.commands.scrape_books import BookScraper, Command as ScrapeCommand
+from .models import Book, CrawlTask, FrontierURL, Genre, ScrapingLog, SimilarBook
+from .pagination import BookCursorPagination
+from .parsers import PARSERS, get_parser
+from .pipeline import BookPipeline, CrawlControl, ImageStage, PageDone
+from .replay import FixtureCatalog, ReplayServer
+from .search import RANKINGS, has_trigram
+from .similarity import rank_similar
+from .tasks import HEARTBEAT_TIMEOUT, enqueue_scraping, reclaim_stale_scrapings
+from .throttling import AdaptiveThrottle, CircuitBreaker, CircuitOpenError, RateLimiter
+
+
+def listing_response(count, prices=None):
+    prices = prices or {}
+    pods = ''.join(
+        f'<article class="product_pod"><h3><a href="book-{number}_{number}/index.html" '
+        f'title="Book {number}">Book {number}</a></h3>'
+        f'<p class="price_color">£{prices.get(number, 10)}</p></article>'
+        for number in range(1, count + 1)
+    )
+    return mock.Mock(content=f'<html><body>{pods}</body></html>'.encode())
+
+
+def http_response(url, content=b'', status_code=200, headers=None):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+# Tests that measure or change the catalog run without the response cache
+NO_CATALOG_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+@override_settings(CACHES=NO_CATALOG_CACHE)
+class ReplayScrapeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.server = ReplayServer(FixtureCatalog(pages=2, per_page=5)).start()
+        self.addCleanup(self.server.stop)
+
+    def scrape(self, **options):
+        options = {'no_cache': True, 'rps': 0, **options}
+        with override_settings(MEDIA_ROOT=self.media_root):
+            call_command(
+                'scrape_books',
+                base_url=self.server.url,
+                stdout=StringIO(),
+                **options
+            )
+        return ScrapingLog.objects.latest('id')
+
+    def test_scrapes_replayed_catalog(self):
+        scraping_log = self.scrape()
+
+        self.assertEqual(scraping_log.status, 'completed')
+        self.assertEqual(scraping_log.pages_completed, 2)
+        self.assertEqual(scraping_log.books_created, 10)
+        self.assertEqual(Book.objects.count(), 10)
+        self.assertEqual(Book.objects.exclude(image='').count(), 10)
+
+        book = Book.objects.get(title='Replay Book 1')
+        self.assertTrue(book.source_url.startswith(self.server.url))
+        self.assertGreater(book.price, 0)
+        self.assertEqual((book.image_width, book.image_height, book.image_format), (120, 180, 'jpeg'))
+        with override_settings(MEDIA_ROOT=self.media_root):
+            self.assertEqual(book.image_size, book.image.size)
+
+        throttle = scraping_log.stats['throttle']
+        self.assertEqual(throttle['responses'], self.server.requests)
+        self.assertEqual(throttle['congestion_events'], 0)
+        timings = scraping_log.stats['timings']
+        self.assertEqual(timings['fetch']['count'], 2 + 10)
+        self.assertEqual(timings['image_download']['count'], 10)
+        self.assertEqual(timings['parse']['count'], 2 + 10)
+        self.assertLessEqual(timings['fetch']['p50_ms'], timings['fetch']['p95_ms'])
+        self.assertIn('db_books', timings)
+
+    def test_concurrent_scrape_matches_serial_scrape(self):
+        fields = ('source_url', 'title', 'price', 'rating', 'genre__name')
+        self.scrape(concurrency=1, skip_images=True)
+        serial = list(Book.objects.order_by('source_url').values_list(*fields))
+        Book.objects.all().delete()
+
+        scraping_log = self.scrape(concurrency=8, skip_images=True)
+
+        self.assertEqual(scraping_log.books_created, 10)
+        self.assertEqual(list(Book.objects.order_by('source_url').values_list(*fields)), serial)
+
+    def cover_files(self):
+        return {
+            name for _, _, names in os.walk(os.path.join(self.media_root, 'book_covers'))
+            for name in names
+        }
+
+    def test_rescrape_downloads_no_known_covers(self):
+        scraping_log = self.scrape()
+        covers = self.cover_files()
+        self.assertEqual(len(covers), 10)
+        self.assertEqual(scraping_log.images_fetched, 10)
+
+        requests_before = self.server.requests
+        scraping_log = self.scrape()
+
+        # Listing and detail pages only, the covers come from the store
+        self.assertEqual(self.server.requests - requests_before, 2 + 10)
+        self.assertEqual(scraping_log.images_fetched, 0)
+        self.assertEqual(self.cover_files(), covers)
+        self.assertEqual(Book.objects.exclude(image='').count(), 10)
+
+    def test_skip_images_downloads_no_covers(self):
+        scraping_log = self.scrape(skip_images=True)
+
+        self.assertEqual(self.server.requests, 2 + 10)
+        self.assertNotIn('image_download', scraping_log.stats['timings'])
+        self.assertEqual(scraping_log.books_created, 10)
+        self.assertFalse(Book.objects.exclude(image='').exists())
+        self.assertEqual(self.cover_files(), set())
+
+    def test_rescrape_revalidates_cached_pages(self):
+        cache_dir = os.path.join(self.media_root, 'http_cache')
+        self.scrape(no_cache=False, cache_dir=cache_dir, skip_images=True)
+        self.assertEqual(self.server.not_modified, 0)
+
+        requests_before = self.server.requests
+        bytes_before = self.server.bytes_sent
+        scraping_log = self.scrape(no_cache=False, cache_dir=cache_dir, skip_images=True)
+
+        # Every page is asked for with If-None-Match and none is downloaded again
+        self.assertEqual(self.server.requests - requests_before, 2 + 10)
+        self.assertEqual(self.server.not_modified, 2 + 10)
+        self.assertEqual(self.server.bytes_sent, bytes_before)
+        self.assertEqual(scraping_log.books_unchanged, 10)
+
+    def test_backfill_image_info(self):
+        self.scrape(pages=1)
+        stored = dict(Book.objects.values_list('id', 'image_size'))
+        Book.objects.update(image_width=None, image_height=None, image_size=None, image_format='')
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            call_command('backfill_image_info', stdout=StringIO())
+
+        self.assertEqual(dict(Book.objects.values_list('id', 'image_size')), stored)
+        self.assertFalse(Book.objects.exclude(image_format='jpeg').exists())
+
+        with override_settings(MEDIA_ROOT='/nonexistent'):
+            response = self.client.get(f'/scraping/book_detail/{Book.objects.first().id}/')
+        image_info = response.json()['image_info']
+        self.assertEqual((image_info['width'], image_info['height']), (120, 180))
+        self.assertEqual(image_info['size'], response.json()['image_metadata']['image_size'])
+
+
+    def test_uploaded_cover_is_not_reused_for_the_scraped_url(self):
+        self.scrape(pages=1)
+        book = Book.objects.get(title='Replay Book 1')
+        scraped_image = book.image.name
+
+        admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        upload = BytesIO()
+        Image.new('RGB', (40, 60), 'red').save(upload, 'PNG')
+        with override_settings(MEDIA_ROOT=self.media_root):
+            response = client.patch(
+                f'/scraping/book_update/{book.pk}/',
+                {'image': SimpleUploadedFile('cover.png', upload.getvalue(), 'image/png')},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, 200)
+        book.refresh_from_db()
+        self.assertIsNone(book.image_source_url)
+        self.assertEqual((book.image_width, book.image_height), (40, 60))
+
+        # The scrape brings the scraped cover back instead of keeping the upload
+        self.scrape(pages=1)
+        book.refresh_from_db()
+        self.assertEqual(book.image.name, scraped_image)
+        self.assertTrue(book.image_source_url)
+
+
+    def test_profile_dump_covers_worker_threads(self):
+        path = os.path.join(self.media_root, 'scrape.prof')
+        self.scrape(skip_images=True, pages=1, profile=path)
+
+        functions = {name for _, _, name in pstats.Stats(path).stats}
+        self.assertIn('scrape_book_details', functions)
+        self.assertIn('save_books_to_db', functions)
+
+    def test_books_are_written_in_batches(self):
+        with mock.patch.object(
+            ScrapeCommand, 'save_books_to_db', autospec=True, side_effect=ScrapeCommand.save_books_to_db
+        ) as save_books_to_db:
+            scraping_log = self.scrape(batch_size=3, queue_size=2, skip_images=True)
+
+        # 10 books in batches of at most 3
+        self.assertEqual([len(call.args[1]) for call in save_books_to_db.call_args_list], [3, 3, 3, 1])
+        self.assertEqual(scraping_log.books_created, 10)
+        self.assertEqual(Book.objects.count(), 10)
+
+    def test_rescrape_only_writes_changed_books(self):
+        self.scrape(skip_images=True)
+        Book.objects.filter(title='Replay Book 1').update(price=1)
+        written = dict(Book.objects.values_list('title', 'updated_at'))
+
+        scraping_log = self.scrape(skip_images=True)
+
+        self.assertEqual(scraping_log.books_created, 0)
+        self.assertEqual(scraping_log.books_updated, 1)
+        self.assertEqual(scraping_log.books_unchanged, 9)
+        self.assertEqual(Book.objects.count(), 10)
+        for title, updated_at in Book.objects.values_list('title', 'updated_at'):
+            if title == 'Replay Book 1':
+                self.assertGreater(updated_at, written[title])
+            else:
+                self.assertEqual(updated_at, written[title])
+        self.assertNotEqual(Book.objects.get(title='Replay Book 1').price, 1)
+
+    def test_incremental_rescrape_skips_unchanged_books(self):
+        self.scrape(incremental=True, skip_images=True)
+        written = dict(Book.objects.values_list('id', 'updated_at'))
+
+        requests_before = self.server.requests
+        with CaptureQueriesContext(connection) as queries:
+            scraping_log = self.scrape(incremental=True, skip_images=True)
+
+        # Only the listing pages are fetched, no book row is written
+        self.assertEqual(self.server.requests - requests_before, 2)
+        self.assertEqual(scraping_log.books_unchanged, 10)
+        self.assertEqual(scraping_log.books_updated, 0)
+        self.assertEqual(dict(Book.objects.values_list('id', 'updated_at')), written)
+        book_writes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE')) and '"scraper_book"' in query['sql']
+        ]
+        self.assertEqual(book_writes, [])
+
+    def test_resume_continues_from_the_checkpoint(self):
+        scraping_log = self.scrape(pages=1, skip_images=True)
+        self.assertEqual(scraping_log.checkpoint['pending'], [f'{self.server.url}catalogue/page-2.html'])
+
+        requests_before = self.server.requests
+        self.scrape(resume=scraping_log.id, skip_images=True)
+
+        # Page 2 and its books only
+        self.assertEqual(self.server.requests - requests_before, 1 + 5)
+        scraping_log.refresh_from_db()
+        self.assertEqual(scraping_log.status, 'completed')
+        self.assertFalse(scraping_log.checkpoint.get('pending'))
+        self.assertEqual(ScrapingLog.objects.count(), 1)
+        self.assertEqual(Book.objects.count(), 10)
+
+    def test_worker_runs_queued_scraping(self):
+        queued = enqueue_scraping(
+            base_url=self.server.url,
+            no_cache=True,
+            rps=0,
+            skip_images=True,
+            pages=1
+        )
+
+        call_command('run_scrape_worker', once=True, stdout=StringIO())
+
+        queued.refresh_from_db()
+        self.assertEqual(ScrapingLog.objects.count(), 1)
+        self.assertEqual(queued.status, 'completed')
+        self.assertEqual(queued.books_created, 5)
+
+    def test_job_stopped_before_start_does_not_run(self):
+        queued = enqueue_scraping(skip_images=True, pages=1)
+        ScrapingLog.objects.filter(pk=queued.pk).update(status='interrupted')
+
+        self.scrape(log_id=queued.id, skip_images=True, pages=1)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'interrupted')
+        self.assertEqual(self.server.requests, 0)
+        self.assertEqual(Book.objects.count(), 0)
+
+        # Resuming is an explicit request to go on with a stopped crawl
+        self.scrape(resume=queued.id, skip_images=True, pages=1)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'completed')
+        self.assertEqual(Book.objects.count(), 5)
+
+    def test_workers_share_one_scraping_log(self):
+        scraping_log = self.scrape(worker=True, skip_images=True, batch_size=4)
+        call_command(
+            'scrape_books',
+            worker=True,
+            log_id=scraping_log.id,
+            base_url=self.server.url,
+            no_cache=True,
+            rps=0,
+            stdout=StringIO()
+        )
+
+        scraping_log.refresh_from_db()
+        self.assertEqual(scraping_log.status, 'completed')
+        self.assertEqual(scraping_log.pages_completed, 2)
+        self.assertEqual(scraping_log.books_created, 10)
+        self.assertEqual(Book.objects.count(), 10)
+        self.assertEqual(
+            set(CrawlTask.objects.filter(scraping_log=scraping_log).values_list('status', flat=True)),
+            {'done'}
+        )
+
+    def test_workers_split_the_rate_limit(self):
+        scraping_log = ScrapingLog.objects.create()
+        crawl_queue.enqueue(scraping_log, 'book', [f'https://example.com/{number}' for number in range(3)])
+        crawl_queue.claim(scraping_log, 'first', limit=1)
+        crawl_queue.claim(scraping_log, 'second', limit=1)
+        crawl_queue.claim(scraping_log, 'gone', limit=1, lease_seconds=-1)
+        self.assertEqual(crawl_queue.active_workers(scraping_log), 2)
+
+        with mock.patch.object(crawl_queue, 'active_workers', return_value=2), \
+                mock.patch.object(RateLimiter, 'set_rps', autospec=True) as set_rps:
+            self.scrape(worker=True, skip_images=True, pages=1, rps=8)
+        self.assertEqual({call.args[1] for call in set_rps.call_args_list}, {4.0})
+
+    def test_scraping_without_heartbeats_is_interrupted(self):
+        scraping_log = self.scrape(pages=1, skip_images=True)
+        self.assertIsNotNone(scraping_log.heartbeat_at)
+
+        long_ago = timezone.now() - timedelta(seconds=HEARTBEAT_TIMEOUT + 60)
+        alive = ScrapingLog.objects.create(status='running', heartbeat_at=timezone.now())
+        dead = ScrapingLog.objects.create(status='paused', heartbeat_at=long_ago)
+        queued = enqueue_scraping()
+        ScrapingLog.objects.filter(pk__in=[alive.pk, dead.pk, queued.pk]).update(started_at=long_ago)
+
+        self.assertEqual(reclaim_stale_scrapings(), 1)
+        self.assertEqual(
+            [ScrapingLog.objects.get(pk=log.pk).status for log in (alive, dead, queued)],
+            ['running', 'interrupted', 'queued']
+        )
+
+        # A dead job no longer blocks starting a new one
+        ScrapingLog.objects.filter(pk__in=[alive.pk, queued.pk]).update(heartbeat_at=long_ago, status='running')
+        self.client.force_login(get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        ))
+        response = self.client.post('/scraping/start/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(ScrapingLog.objects.filter(status='interrupted').count(), 3)
+
+    def test_scrape_precomputes_similar_books(self):
+        self.scrape(skip_images=True)
+        genre_sizes = list(Genre.objects.annotate(size=Count('book')).values_list('id', 'size'))
+        self.assertEqual(
+            SimilarBook.objects.count(),
+            sum(size * min(size - 1, 3) for _, size in genre_sizes)
+        )
+
+        genre_id = max(genre_sizes, key=lambda genre: genre[1])[0]
+        genre_books = list(Book.objects.filter(genre_id=genre_id).values_list('id', 'rating', 'price'))
+        book_id = genre_books[0][0]
+        expected = rank_similar(genre_books)[book_id]
+
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/scraping/book_detail/{book_id}/')
+        similar = [item['id'] for item in response.json()['similar_books']]
+        self.assertEqual(similar, expected)
+        self.assertNotIn(book_id, similar)
+
+
+    def test_moving_a_book_reranks_both_genres(self):
+        self.scrape(skip_images=True)
+        genre = Genre.objects.annotate(size=Count('book')).order_by('-size').first()
+        self.assertGreater(genre.size, 1)
+        book = Book.objects.filter(genre=genre).first()
+        book.genre = Genre.objects.create(name='Elsewhere')
+        # The genres are reranked once the write is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            book.save()
+
+        self.assertFalse(SimilarBook.objects.filter(similar=book).exists())
+        genre_sizes = Genre.objects.annotate(size=Count('book')).values_list('size', flat=True)
+        self.assertEqual(
+            SimilarBook.objects.count(),
+            sum(size * min(size - 1, 3) for size in genre_sizes if size)
+        )
+
+
+    def test_due_mode_only_fetches_due_and_changed_pages(self):
+        self.scrape(due=True, skip_images=True)
+        self.assertEqual(FrontierURL.objects.filter(kind='listing').count(), 2)
+        self.assertEqual(FrontierURL.objects.filter(kind='book').count(), 10)
+
+        requests_before = self.server.requests
+        scraping_log = self.scrape(due=True, skip_images=True)
+        self.assertEqual(self.server.requests, requests_before)
+        self.assertEqual(scraping_log.pages_completed, 0)
+
+        FrontierURL.objects.filter(kind='listing').update(
+            next_fetch_at=timezone.now() - timedelta(minutes=1)
+        )
+        requests_before = self.server.requests
+        scraping_log = self.scrape(due=True, skip_images=True)
+        self.assertEqual(self.server.requests - requests_before, 2)
+        self.assertEqual(scraping_log.total_books_found, 10)
+        self.assertEqual(scraping_log.books_updated, 0)
+
+    def test_cancelled_crawl_stops_at_page_boundary(self):
+        scraper = BookScraper(base_url=self.server.url)
+        items = []
+        for item in scraper.iter_books([scraper.start_url]):
+            items.append(item)
+            if isinstance(item, PageDone):
+                scraper.control.cancel()
+
+        pages = [item for item in items if isinstance(item, PageDone)]
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(len(items), 6)
+        self.assertEqual(pages[0].pending, [f'{self.server.url}catalogue/page-2.html'])
+
+    def test_paused_crawl_downloads_no_covers(self):
+        controls = []
+        downloads = []
+        polls_while_paused = []
+        original_download = BookScraper.download_image
+        original_save = ScrapeCommand.save_books_to_db
+        original_poll = ScrapeCommand.poll_control
+
+        class RecordedControl(CrawlControl):
+            def __init__(self):
+                super().__init__()
+                controls.append(self)
+
+        def download_image(scraper, url):
+            downloads.append(scraper.control.paused)
+            return original_download(scraper, url)
+
+        def save_books_to_db(command, books_data, verbose=False):
+            # Paused after the books are written, before their covers are handed out
+            ScrapingLog.objects.update(status='paused')
+            controls[0].pause()
+            return original_save(command, books_data, verbose)
+
+        def poll_control(command, scraping_log, control):
+            if control.paused:
+                polls_while_paused.append(len(downloads))
+                if len(polls_while_paused) == 3:
+                    ScrapingLog.objects.update(status='running')
+            return original_poll(command, scraping_log, control)
+
+        with mock.patch('scraper.management.commands.scrape_books.CrawlControl', RecordedControl), \
+                mock.patch.object(ScrapeCommand, 'CONTROL_POLL_INTERVAL', 0), \
+                mock.patch.object(ScrapeCommand, 'WORKER_IDLE_INTERVAL', 0.01), \
+                mock.patch.object(BookScraper, 'download_image', autospec=True, side_effect=download_image), \
+                mock.patch.object(ScrapeCommand, 'save_books_to_db', autospec=True, side_effect=save_books_to_db), \
+                mock.patch.object(ScrapeCommand, 'poll_control', autospec=True, side_effect=poll_control):
+            scraping_log = self.scrape(pages=1, batch_size=5)
+
+        self.assertEqual(polls_while_paused, [0, 0, 0])
+        self.assertEqual(downloads, [False] * 5)
+        self.assertEqual(scraping_log.status, 'completed')
+        self.assertEqual(scraping_log.images_fetched, 5)
+
+    def test_benchmark_reports_throughput(self):
+        stdout = StringIO()
+        call_command(
+            'benchmark_scraper',
+            pages=1,
+            per_page=5,
+            latency=0,
+            skip_images=True,
+            stdout=stdout
+        )
+
+        self.assertIn('Books/sec', stdout.getvalue())
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_benchmark_leaves_no_covers_behind(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            call_command('benchmark_scraper', pages=1, per_page=5, latency=0, stdout=StringIO())
+
+        self.assertEqual(os.listdir(self.media_root), [])
+        self.assertEqual(Book.objects.count(), 0)
+
+
+@override_settings(CACHES=NO_CATALOG_CACHE)
+class BookListQueryTests(TestCase):
+    def add_books(self, count):
+        start = Genre.objects.count()
+        for number in range(start, start + count):
+            genre = Genre.objects.create(name=f'Genre {number}')
+            Book.objects.create(title=f'Book {number}', genre=genre, price=10)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for url, key in (('/scraping/book_list/?page_size=50', 'results'),
+                         ('/scraping/book_search/?page_size=50', 'books')):
+            Book.objects.all().delete()
+            self.add_books(3)
+            few, data = self.count_queries(url)
+            self.assertEqual(len(data[key]), 3)
+            self.assertEqual(data[key][0]['genre']['books_count'], 1)
+
+            self.add_books(30)
+            many, data = self.count_queries(url)
+            self.assertEqual(len(data[key]), 33)
+            self.assertEqual(many, few)
+
+    def test_genre_counts_cover_only_the_page(self):
+        self.add_books(12)
+        Book.objects.create(title='Book 11 again', genre=Genre.objects.get(name='Genre 11'), price=10)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/scraping/book_list/?page_size=5').json()
+
+        counts = {book['genre']['name']: book['genre']['books_count'] for book in data['results']}
+        self.assertEqual(counts, {'Genre 11': 2, 'Genre 10': 1, 'Genre 9': 1, 'Genre 8': 1})
+        count_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'AS "books_count"' in query['sql']
+        ]
+        self.assertEqual(len(count_queries), 1)
+        # Only the 4 genres on the page are counted
+        self.assertEqual(count_queries[0].split(' IN (')[1].split(')')[0].count(',') + 1, 4)
+
+    def test_cursor_pages_cover_every_book_once(self):
+        self.add_books(12)
+        url = '/scraping/book_list/?page_size=5'
+        titles = []
+        page_queries = []
+        while url:
+            queries, data = self.count_queries(url)
+            page_queries.append(queries)
+            self.assertNotIn('count', data)
+            titles.extend(book['title'] for book in data['results'])
+            url = data['next']
+
+        self.assertEqual(titles, list(Book.objects.order_by('-created_at', '-id').values_list('title', flat=True)))
+        self.assertEqual(len(page_queries), 3)
+        self.assertEqual(len(set(page_queries)), 1)
+
+        _, data = self.count_queries('/scraping/book_search/?page_size=5&count=true')
+        self.assertEqual(data['total_found'], 12)
+        self.assertEqual(len(data['books']), 5)
+        _, data = self.count_queries(data['next'])
+        self.assertEqual(len(data['books']), 5)
+        self.assertIsNotNone(data['previous'])
+
+    def walk_cursor(self, queryset, page_size):
+        def page(url):
+            paginator = BookCursorPagination()
+            books = paginator.paginate_queryset(queryset, Request(APIRequestFactory().get(url)))
+            return [book.title for book in books], paginator.get_next_link(), paginator.get_previous_link()
+
+        url = f'/scraping/book_list/?page_size={page_size}'
+        forward = []
+        while url:
+            titles, url, previous = page(url)
+            forward.extend(titles)
+        # Then back from the last page
+        backward = titles
+        while previous:
+            titles, _, previous = page(previous)
+            backward = titles + backward
+        return forward, backward
+
+    def test_cursor_walks_tied_ranks_once(self):
+        self.add_books(12)
+        # Every book ties on the rank and on the timestamp, only the id tells them apart
+        Book.objects.update(created_at=timezone.now())
+        expected = list(Book.objects.order_by('-id').values_list('title', flat=True))
+
+        for rank in RANKINGS:
+            with self.subTest(rank=rank):
+                ranked = Book.objects.annotate(**{rank: Value(0.5, output_field=FloatField())})
+                forward, backward = self.walk_cursor(ranked, page_size=5)
+                self.assertEqual(forward, expected)
+                self.assertEqual(backward, expected)
+
+    def search_titles(self, url):
+        titles = []
+        while url:
+            _, data = self.count_queries(url)
+            titles.extend(book['title'] for book in data['books'])
+            url = data['next']
+        return titles
+
+    def test_search_ranks_title_then_genre_then_description(self):
+        dragons = Genre.objects.create(name='Dragons')
+        other = Genre.objects.create(name='Other')
+        Book.objects.create(title='Dragon Lord', genre=other, price=10)
+        Book.objects.create(title='Garden', description='A dragon appears', genre=other, price=10)
+        Book.objects.create(title='Caves', genre=dragons, price=10)
+        Book.objects.create(title='Unrelated', description='Nothing here', genre=other, price=10)
+
+        _, data = self.count_queries('/scraping/book_search/?search=dragon&count=true')
+        self.assertEqual(data['total_found'], 3)
+        titles = [book['title'] for book in data['books']]
+        if connection.vendor == 'postgresql':
+            self.assertEqual(titles, ['Dragon Lord', 'Caves', 'Garden'])
+        else:
+            self.assertCountEqual(titles, ['Dragon Lord', 'Caves', 'Garden'])
+        # The cursor walks ranked results in the same order, one page at a time
+        self.assertEqual(self.search_titles('/scraping/book_search/?search=dragon&page_size=1'), titles)
+
+        _, data = self.count_queries('/scraping/book_list/?search=dragon%20lord')
+        self.assertEqual([book['title'] for book in data['results']], ['Dragon Lord'])
+
+        dragons.name = 'Wyverns'
+        dragons.save()
+        _, data = self.count_queries('/scraping/book_search/?search=wyvern')
+        self.assertEqual([book['title'] for book in data['books']], ['Caves'])
+
+
+    def test_fuzzy_title_tolerates_typos(self):
+        Book.objects.create(title='Harry Potter', price=10)
+        Book.objects.create(title='Hard Times', price=10)
+
+        _, data = self.count_queries('/scraping/book_list/?title=potter&fuzzy=true')
+        self.assertEqual([book['title'] for book in data['results']], ['Harry Potter'])
+        self.assertEqual(data['active_filters'], {'title': 'potter', 'fuzzy': 'true'})
+        _, data = self.count_queries('/scraping/book_stats/')
+        self.assertIn('fuzzy=true', data['filter_examples']['by_title_with_typos'])
+
+        if not has_trigram(connection.alias):
+            self.skipTest('pg_trgm is not installed')
+        _, data = self.count_queries('/scraping/book_search/?title=hary%20poter&fuzzy=true')
+        self.assertEqual([book['title'] for book in data['books']], ['Harry Potter'])
+
+        # Equally similar titles are paged one by one without repeats
+        reprints = [Book.objects.create(title='Harry Potter', price=price).id for price in (11, 12)]
+        _, data = self.count_queries('/scraping/book_search/?title=hary%20poter&fuzzy=true&page_size=1')
+        ids = []
+        while True:
+            ids.extend(book['id'] for book in data['books'])
+            if not data['next']:
+                break
+            _, data = self.count_queries(data['next'])
+        self.assertEqual(ids[:2], reprints[::-1])
+        self.assertEqual(len(set(ids)), 3)
+
+    def test_search_benchmark_rolls_back_seeded_books(self):
+        stdout = StringIO()
+        call_command('benchmark_search', books=200, repeat=1, stdout=stdout)
+
+        self.assertIn("search 'dragon': p50", stdout.getvalue())
+        self.assertEqual(Book.objects.count(), 0)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'catalog-tests'},
+})
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.book = Book.objects.create(title='First', price=10)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_responses_are_cached_until_the_catalog_changes(self):
+        first = self.get('/scraping/book_list/?page_size=5&count=true')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/scraping/book_list/?page_size=5&count=true'), first)
+        first = self.get('/scraping/book_stats/')
+        # Only the last scraping is read again
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get('/scraping/book_stats/'), first)
+
+        # Same query with reordered and empty parameters
+        with self.assertNumQueries(0):
+            data = self.get('/scraping/book_list/?count=true&title=&page_size=5')
+        self.assertEqual(data['count'], 1)
+
+        # Bulk writes send no signals; they only show once the version moves on
+        Book.objects.bulk_create([Book(title='Second', price=10)])
+        self.assertEqual(self.get('/scraping/book_stats/')['total_books'], 1)
+        bump_catalog_version()
+        self.assertEqual(self.get('/scraping/book_stats/')['total_books'], 2)
+
+    def test_stats_show_the_current_scraping_status(self):
+        self.assertIsNone(self.get('/scraping/book_stats/')['last_scraping'])
+
+        scraping_log = enqueue_scraping()
+        self.assertEqual(self.get('/scraping/book_stats/')['last_scraping']['status'], 'queued')
+        ScrapingLog.objects.filter(pk=scraping_log.pk).update(status='running')
+        self.assertEqual(self.get('/scraping/book_stats/')['last_scraping']['status'], 'running')
+
+    def test_model_writes_invalidate_cached_lists(self):
+        # As the Django admin saves and deletes them
+        self.get('/scraping/book_search/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Genre.objects.create(name='Poetry')
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title='Second', price=10)
+        self.assertEqual(len(self.get('/scraping/book_search/')['books']), 2)
+
+        genre = Genre.objects.get(name='Poetry')
+        self.book.genre = genre
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.save()
+        self.assertEqual(self.get('/scraping/book_search/?genre=poetry')['books'][0]['title'], 'First')
+        genre.name = 'Poems'
+        with self.captureOnCommitCallbacks(execute=True):
+            genre.save()
+        self.assertEqual(self.get('/scraping/book_search/?genre=poems')['books'][0]['title'], 'First')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            genre.delete()
+        self.assertEqual(self.get('/scraping/book_search/?genre=poems')['books'], [])
+
+    def test_book_writes_invalidate_cached_lists(self):
+        self.assertEqual(self.get('/scraping/book_search/')['books'][0]['title'], 'First')
+
+        admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/scraping/book_update/{self.book.pk}/', {'title': 'Renamed'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get('/scraping/book_search/')['books'][0]['title'], 'Renamed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/scraping/book_delete/{self.book.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get('/scraping/book_search/')['books'], [])
+
+
+class ScrapingStatusStreamTests(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        self.client.force_login(admin)
+
+    def test_stream_sends_progress_until_finished(self):
+        scraping_log = ScrapingLog.objects.create(
+            status='completed',
+            pages_completed=3,
+            total_books_found=60,
+            images_fetched=58,
+            errors_count=2
+        )
+
+        response = self.client.get(
+            f'/scraping/status/{scraping_log.id}/stream/',
+            HTTP_ACCEPT='text/event-stream'
+        )
+        body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = [line for line in body.splitlines() if line.startswith('data: ')]
+        self.assertEqual(len(events), 1)
+        data = json.loads(events[0][len('data: '):])
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['images_fetched'], 58)
+        self.assertEqual(data['errors_count'], 2)
+
+    def test_stream_stops_polling_when_client_disconnects(self):
+        scraping_log = ScrapingLog.objects.create(status='running')
+
+        response = self.client.get(
+            f'/scraping/status/{scraping_log.id}/stream/',
+            HTTP_ACCEPT='text/event-stream'
+        )
+        events = iter(response.streaming_content)
+        self.assertTrue(next(events).startswith(b'retry:'))
+        self.assertTrue(next(events).startswith(b'event: progress'))
+
+        # What the server does once a write to the client fails
+        response.close()
+        with self.assertNumQueries(0):
+            self.assertIsNone(next(events, None))
+
+
+class FrontierScheduleTests(SimpleTestCase):
+    def fetch(self, entry, content_hash, at):
+        return frontier.observe(entry, content_hash, at)
+
+    def test_unchanged_page_backs_off(self):
+        now = timezone.now()
+        entry = FrontierURL(url='https://example.com/a', kind='book', next_fetch_at=now)
+        self.fetch(entry, 'a', now)
+        self.assertEqual(entry.next_fetch_at - now, frontier.DEFAULT_INTERVAL)
+
+        for _ in range(3):
+            now = entry.next_fetch_at
+            previous = entry.next_fetch_at - entry.last_fetched_at
+            self.fetch(entry, 'a', now)
+            self.assertEqual(entry.next_fetch_at - now, min(previous * 2, frontier.MAX_INTERVAL))
+        self.assertEqual(entry.change_rate, 0)
+
+    def test_frequently_changing_page_is_revisited_sooner(self):
+        now = timezone.now()
+        entry = FrontierURL(url='https://example.com/b', kind='listing', next_fetch_at=now)
+        for version in range(5):
+            self.fetch(entry, str(version), now)
+            now += timedelta(days=1)
+
+        self.assertEqual(entry.change_count, 4)
+        self.assertGreater(entry.change_rate, 1)
+        self.assertLess(entry.next_fetch_at - entry.last_fetched_at, timedelta(days=1))
+        self.assertGreaterEqual(entry.next_fetch_at - entry.last_fetched_at, frontier.MIN_INTERVAL)
+
+
+class FetchThrottleTests(SimpleTestCase):
+    def test_throttle_grows_until_overloaded(self):
+        throttle = AdaptiveThrottle(max_concurrency=8)
+        self.assertEqual(throttle.state()['limit'], 1)
+        for _ in range(10):
+            throttle.release(throttle.acquire(), latency=0.01)
+        self.assertEqual(throttle.state()['limit'], 8)
+
+        # One overload burst halves the limit once
+        tokens = [throttle.acquire() for _ in range(4)]
+        for token in tokens:
+            throttle.release(token, congested=True)
+        state = throttle.state()
+        self.assertEqual(state['limit'], 4)
+        self.assertEqual(state['congestion_events'], 4)
+        self.assertEqual(state['decreases'], 1)
+
+    def test_circuit_fails_fast_until_probe_succeeds(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+        url = 'https://example.com/catalogue/page-1.html'
+        for _ in range(3):
+            breaker.before(url)
+            breaker.failure(url)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before(url)
+
+        time.sleep(0.06)
+        breaker.before(url)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before(url)
+        breaker.success(url)
+        breaker.before(url)
+        self.assertEqual(
+            breaker.state()['example.com'],
+            {'state': 'closed', 'failures': 0, 'trips': 1, 'rejected': 2}
+        )
+
+
+class SimilarBooksTests(SimpleTestCase):
+    def test_ranks_by_rating_then_price_then_id(self):
+        books = [(1, 5, 10), (2, 5, 12), (3, 4, 10), (4, 5, 30), (5, 1, 10), (6, 5, 8)]
+        similar = rank_similar(books)
+
+        self.assertEqual(similar[1], [2, 6, 4])
+        # 2 and 6 are equally far from 5, the lower id wins
+        self.assertEqual(similar[5], [3, 1, 2])
+        self.assertEqual(rank_similar(list(reversed(books))), similar)
+
+    def test_closest_books_are_not_only_sort_neighbours(self):
+        books = [(1, 3, 50), (2, 4, 10), (3, 4, 20), (4, 4, 30), (5, 4, 40), (6, 4, 50)]
+        self.assertEqual(rank_similar(books)[1], [6, 5, 4])
+
+    def test_matches_comparing_every_pair(self):
+        rng = random.Random(7)
+        # Few distinct prices, so most books tie with many others
+        books = [(book_id, rng.randint(0, 5), rng.randint(1, 20)) for book_id in range(1, 300)]
+        expected = {
+            book_id: [other_id for _, _, other_id in sorted(
+                (abs(other_rating - rating), abs(other_price - price), other_id)
+                for other_id, other_rating, other_price in books
+                if other_id != book_id
+            )[:3]]
+            for book_id, rating, price in books
+        }
+        self.assertEqual(rank_similar(books), expected)
+
+
+class BookScraperTests(SimpleTestCase):
+    def test_details_are_fetched_concurrently_in_listing_order(self):
+        scraper = BookScraper(concurrency=4)
+        # Only passes once four detail pages are in flight together
+        barrier = threading.Barrier(4, timeout=5)
+
+        def scrape_book_details(book_url):
+            barrier.wait()
+            return {'title': book_url}
+
+        with mock.patch.object(scraper, 'get_page', return_value=listing_response(8)), \
+                mock.patch.object(scraper, 'scrape_book_details', side_effect=scrape_book_details):
+            books = scraper.scrape_books_from_page(f'{scraper.base_url}catalogue/page-1.html')[0]
+
+        self.assertFalse(barrier.broken)
+        self.assertEqual(
+            [book['title'] for book in books],
+            [f'{scraper.base_url}catalogue/book-{number}_{number}/index.html' for number in range(1, 9)]
+        )
+
+    def test_incremental_scrape_skips_books_with_known_fingerprints(self):
+        page_url = 'https://books.toscrape.com/catalogue/page-1.html'
+
+        def scrape(listing, known_fingerprints=None):
+            scraper = BookScraper(known_fingerprints=known_fingerprints)
+            with mock.patch.object(scraper, 'get_page', return_value=listing), \
+                    mock.patch.object(scraper, 'scrape_book_details', side_effect=lambda url: {'title': url}):
+                books = scraper.scrape_books_from_page(page_url)[0]
+            return scraper, {book['title']: book['listing_hash'] for book in books}
+
+        _, fingerprints = scrape(listing_response(3))
+        self.assertEqual(len(set(fingerprints.values())), 3)
+
+        scraper, changed = scrape(listing_response(3, prices={2: 12}), known_fingerprints=fingerprints)
+
+        # Only the book whose price changed on the listing page is fetched again
+        book_url = 'https://books.toscrape.com/catalogue/book-2_2/index.html'
+        self.assertEqual(list(changed), [book_url])
+        self.assertNotEqual(changed[book_url], fingerprints[book_url])
+        self.assertEqual(scraper.unchanged_count, 2)
+
+    def test_rate_limiter_spaces_requests_per_host(self):
+        limiter = RateLimiter(rps=50)
+        threads = [
+            threading.Thread(target=limiter.wait, args=('https://example.com/a',))
+            for _ in range(6)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Six requests to one host take five intervals, however many threads send them
+        self.assertGreaterEqual(time.monotonic() - started, 5 / 50)
+
+        # Another host has a budget of its own
+        started = time.monotonic()
+        limiter.wait('https://other.example.com/a')
+        self.assertLess(time.monotonic() - started, 1 / 50)
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+
+    def test_cached_page_is_revalidated_with_its_etag(self):
+        url = 'https://books.toscrape.com/catalogue/page-1.html'
+        sent_headers = []
+
+        def get(url, timeout, headers=None):
+            sent_headers.append(headers)
+            if headers and headers.get('If-None-Match') == '"v1"':
+                return http_response(url, status_code=304, headers={'ETag': '"v1"'})
+            return http_response(
+                url, b'<html>page</html>', headers={'ETag': '"v1"', 'Content-Type': 'text/html'}
+            )
+
+        scraper = BookScraper(cache=ResponseCache(self.cache_dir))
+        with mock.patch.object(scraper.session, 'get', side_effect=get):
+            self.assertEqual(scraper.get_page(url).content, b'<html>page</html>')
+            response = scraper.get_page(url)
+
+        self.assertEqual(sent_headers, [{}, {'If-None-Match': '"v1"'}])
+        self.assertTrue(response.from_cache)
+        self.assertEqual(response.content, b'<html>page</html>')
+        # download_image reads the header in lower case, as on a requests.Response
+        self.assertEqual(response.headers.get('content-type'), 'text/html')
+        self.assertEqual((scraper.cache.hits, scraper.cache.misses), (1, 1))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResponseCache(self.cache_dir, max_bytes=25)
+        for name in ['a', 'b']:
+            url = f'https://example.com/{name}'
+            cache.store(url, http_response(url, b'x' * 10, headers={'ETag': name}))
+        cache.load('https://example.com/a', cache.lookup('https://example.com/a'))
+
+        url = 'https://example.com/c'
+        cache.store(url, http_response(url, b'x' * 10, headers={'ETag': 'c'}))
+
+        self.assertIsNone(cache.lookup('https://example.com/b'))
+        self.assertEqual(cache.lookup('https://example.com/a'), {'ETag': 'a'})
+        # The evicted files are gone from disk too
+        self.assertIsNone(ResponseCache(self.cache_dir).lookup('https://example.com/b'))
+
+
+class SaveBooksTests(TestCase):
+    GENRES = ['Poetry', 'Travel', 'History']
+
+    def books(self, count, price=10):
+        return [
+            {
+                'url': f'https://example.com/catalogue/book-{number}/index.html',
+                'title': f'Book {number}',
+                'isbn': f'{number:013d}',
+                'genre': self.GENRES[number % len(self.GENRES)],
+                'price': price,
+                'rating': 3,
+                'description': 'A book',
+                'in_stock': True,
+                'availability': 'In stock (5 available)',
+            }
+            for number in range(count)
+        ]
+
+    def save(self, books):
+        command = ScrapeCommand(stdout=StringIO())
+        command.changed_genres = set()
+        with CaptureQueriesContext(connection) as queries:
+            counts = command.save_books_to_db(books)
+        return counts, len(queries)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        counts, small_batch_queries = self.save(self.books(3))
+        self.assertEqual(counts, (3, 0, 0))
+        Book.objects.all().delete()
+        Genre.objects.all().delete()
+
+        counts, queries = self.save(self.books(40))
+        self.assertEqual(counts, (40, 0, 0))
+        self.assertEqual(queries, small_batch_queries)
+
+        counts, _ = self.save(self.books(40, price=12))
+        self.assertEqual(counts, (0, 40, 0))
+        counts, _ = self.save(self.books(40, price=12))
+        self.assertEqual(counts, (0, 0, 40))
+        self.assertEqual(set(Book.objects.values_list('price', flat=True)), {12})
+        self.assertEqual(Book.objects.count(), 40)
+        self.assertEqual(Genre.objects.count(), 3)
+
+
+class ImageStoreTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.storage = FileSystemStorage(location=media_root)
+
+    def test_identical_covers_share_one_file(self):
+        store = ImageStore(storage=self.storage)
+        first_hash, first_name, _ = store.save(b'cover', 'a.jpg', source_url='https://example.com/a.jpg')
+        second_hash, second_name, _ = store.save(b'cover', 'b.jpg', source_url='https://example.com/b.jpg')
+
+        self.assertEqual((first_hash, first_name), (second_hash, second_name))
+        self.assertEqual(self.storage.listdir(f'book_covers/{first_hash[:2]}')[1], [f'{first_hash}.jpg'])
+        self.assertEqual(store.lookup('https://example.com/b.jpg'), first_name)
+
+    def test_known_covers_are_loaded_from_the_books(self):
+        _, name, _ = ImageStore(storage=self.storage).save(b'cover', 'a.jpg')
+        Book.objects.create(title='Book', image=name, image_source_url='https://example.com/a.jpg')
+        Book.objects.create(title='Other', image='book_covers/gone.jpg', image_source_url='https://example.com/b.jpg')
+
+        store = ImageStore(storage=self.storage)
+        store.load_known()
+
+        self.assertEqual(store.lookup('https://example.com/a.jpg'), name)
+        # A cover missing from the storage is downloaded again
+        self.assertIsNone(store.lookup('https://example.com/b.jpg'))
+
+    def test_scraper_downloads_only_unknown_covers(self):
+        store = ImageStore(storage=self.storage)
+        known = store.save(b'known', 'a.jpg', source_url='https://example.com/a.jpg')
+        scraper = BookScraper(image_store=store)
+
+        with mock.patch.object(scraper, 'download_image', return_value=(b'new', 'b.jpg')) as download:
+            self.assertEqual(scraper.store_image('https://example.com/a.jpg'), known)
+            _, name, _ = scraper.store_image('https://example.com/b.jpg')
+
+        download.assert_called_once_with('https://example.com/b.jpg')
+        self.assertEqual(store.lookup('https://example.com/b.jpg'), name)
+
+
+class BookPipelineTests(SimpleTestCase):
+    def test_producer_waits_for_the_consumer(self):
+        produced = []
+
+        def source():
+            for number in range(100):
+                produced.append(number)
+                yield number
+
+        items = iter(BookPipeline(source(), maxsize=5))
+        self.assertEqual(next(items), 0)
+        time.sleep(0.2)
+        # The item handed over, a full queue and the one waiting to go in
+        self.assertLessEqual(len(produced), 1 + 5 + 1)
+        self.assertEqual(list(items), list(range(1, 100)))
+
+    def test_producer_error_reaches_the_consumer(self):
+        def source():
+            yield 1
+            raise ValueError('broken page')
+
+        with self.assertRaisesMessage(ValueError, 'broken page'):
+            list(BookPipeline(source()))
+
+
+class ParserTests(SimpleTestCase):
+    FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'html')
+    BOOK_URL = 'https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html'
+
+    def fixture(self, name):
+        with open(os.path.join(self.FIXTURES_DIR, f'{name}.html'), 'rb') as page:
+            return page.read()
+
+    def test_engines_return_identical_output(self):
+        listing = self.fixture('listing')
+        detail = self.fixture('detail')
+
+        results = {}
+        for name in PARSERS:
+            parser = get_parser(name)
+            results[name] = (
+                parser.parse_listing(listing),
+                parser.parse_categories(listing),
+                parser.parse_detail(detail, self.BOOK_URL),
+            )
+        expected = results.pop('lxml')
+        self.assertEqual(len(expected[0]['books']), 20)
+        self.assertEqual(expected[0]['books'][0]['title'], 'A Light in the Attic')
+        self.assertEqual(expected[0]['next'], 'page-2.html')
+        self.assertIn('../category/books/poetry_23/index.html', expected[1])
+        self.assertEqual(expected[2]['genre'], 'Poetry')
+        self.assertEqual(expected[2]['price'], 51.77)
+        for name, result in results.items():
+            with self.subTest(parser=name):
+                self.assertEqual(result, expected)
+
+
+class ImageStageTests(SimpleTestCase):
+    def test_jobs_run_on_parallel_workers(self):
+        # Only passes once all four jobs wait at the barrier together
+        barrier = threading.Barrier(4, timeout=5)
+
+        def handler(job):
+            barrier.wait()
+            if job == 'broken':
+                raise ValueError(job)
+            return job if job != 'missing' else None
+
+        stage = ImageStage(handler, workers=4, maxsize=4)
+        for job in ['a', 'b', 'missing', 'broken']:
+            stage.submit(job)
+
+        self.assertEqual(sorted(stage.close()), ['a', 'b'])
+        self.assertFalse(barrier.broken)
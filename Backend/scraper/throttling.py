@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Per-host request budget shared by all scraper threads.
+
+    Every call to ``wait`` reserves the next free slot for the URL's host and
+    sleeps until that slot comes up, so requests to one host never exceed
+    ``rps`` per second no matter how many threads are fetching.
+    """
+
+    def __init__(self, rps=None):
+        self.interval = 1.0 / rps if rps else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def set_rps(self, rps):
+        with self._lock:
+            self.interval = 1.0 / rps if rps else 0.0
+
+    def wait(self, url):
+        if not self.interval:
+            return
+
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, url, seconds):
+        """Holds back every request to the URL's host for ``seconds`` (e.g. a Retry-After)."""
+        host = urlparse(url).netloc
+        with self._lock:
+            resume_at = time.monotonic() + seconds
+            self._next_slot[host] = max(self._next_slot.get(host, 0.0), resume_at)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+class AdaptiveThrottle:
+    """
+    Limit on requests in flight that adapts to how the site copes (AIMD).
+
+    The limit starts at ``min_concurrency`` and doubles every round trip
+    (one increase per successful response) until the first sign of
+    congestion, then grows by one per round trip. Growth stops while the
+    average latency is more than ``latency_factor`` times the fastest seen.
+    A 429/5xx response, a timeout or a connection error cuts the limit by
+    ``decrease_factor``; responses to requests sent before the cut don't
+    cut it again, so one overload burst only counts once.
+    """
+
+    def __init__(self, max_concurrency, min_concurrency=1, latency_factor=2.0,
+                 decrease_factor=0.5, adaptive=True):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.latency_factor = latency_factor
+        self.decrease_factor = decrease_factor
+        self.adaptive = adaptive
+        self.limit = float(self.min_concurrency if adaptive else self.max_concurrency)
+        self.threshold = float(self.max_concurrency)
+        self.in_flight = 0
+        self.latency = None
+        self.min_latency = None
+        self.responses = 0
+        self.congestion_events = 0
+        self.decreases = 0
+        self._epoch = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Waits for a free slot and returns a token to pass to ``release``."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return self._epoch
+
+    def release(self, token, latency=None, congested=False):
+        with self._condition:
+            self.in_flight -= 1
+            self.responses += 1
+            if congested:
+                self.congestion_events += 1
+                if self.adaptive and token == self._epoch:
+                    self._decrease()
+            elif latency is not None:
+                self._observe(latency)
+                if self.adaptive and self._fast():
+                    self._increase()
+            self._condition.notify_all()
+
+    def _observe(self, latency):
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+
+    def _fast(self):
+        # Latencies of a few milliseconds are noise, not queueing on the server
+        return self.latency <= max(self.min_latency * self.latency_factor, 0.05)
+
+    def _increase(self):
+        if self.limit < self.threshold:
+            step = 1.0
+        else:
+            step = 1.0 / self.limit
+        self.limit = min(float(self.max_concurrency), self.limit + step)
+
+    def _decrease(self):
+        self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+        self.threshold = self.limit
+        self.decreases += 1
+        self._epoch += 1
+
+    def state(self):
+        with self._condition:
+            return {
+                'adaptive': self.adaptive,
+                'limit': int(self.limit),
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+                'min_latency_ms': round(self.min_latency * 1000, 1) if self.min_latency is not None else None,
+                'responses': self.responses,
+                'congestion_events': self.congestion_events,
+                'decreases': self.decreases,
+            }
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the host's circuit
+    opens and ``before`` raises CircuitOpenError without touching the
+    network. Once ``reset_timeout`` has passed a single probe request is
+    let through: if it succeeds the circuit closes, otherwise it opens
+    again for twice as long (up to ``max_reset_timeout``).
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, max_reset_timeout=300.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = {
+                'state': 'closed',
+                'failures': 0,
+                'opened_until': 0.0,
+                'timeout': self.reset_timeout,
+                'trips': 0,
+                'rejected': 0,
+            }
+        return host, self._hosts[host]
+
+    def before(self, url):
+        with self._lock:
+            host, circuit = self._host(url)
+            if circuit['state'] == 'closed':
+                return
+            if circuit['state'] == 'open' and time.monotonic() >= circuit['opened_until']:
+                circuit['state'] = 'half_open'
+                return
+            circuit['rejected'] += 1
+            raise CircuitOpenError(f"{host} is unavailable, circuit is open")
+
+    def success(self, url):
+        with self._lock:
+            _, circuit = self._host(url)
+            circuit['state'] = 'closed'
+            circuit['failures'] = 0
+            circuit['timeout'] = self.reset_timeout
+
+    def failure(self, url):
+        with self._lock:
+            host, circuit = self._host(url)
+            circuit['failures'] += 1
+            if circuit['state'] == 'half_open':
+                circuit['timeout'] = min(circuit['timeout'] * 2, self.max_reset_timeout)
+            elif circuit['state'] == 'open' or circuit['failures'] < self.failure_threshold:
+                return
+            circuit['state'] = 'open'
+            circuit['opened_until'] = time.monotonic() + circuit['timeout']
+            circuit['trips'] += 1
+            logger.warning(
+                f"Circuit for {host} opened for {circuit['timeout']:.0f}s "
+                f"after {circuit['failures']} failures"
+            )
+
+    def state(self):
+        with self._lock:
+            return {
+                host: {
+                    'state': circuit['state'],
+                    'failures': circuit['failures'],
+                    'trips': circuit['trips'],
+                    'rejected': circuit['rejected'],
+                }
+                for host, circuit in self._hosts.items()
+            }
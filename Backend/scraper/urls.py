@@ -6,7 +6,10 @@ urlpatterns = [
     path('start/', views.StartScrapingView.as_view(), name='start-scraping'),
     path('status/', views.ScrapingStatusView.as_view(), name='scraping-status'),
     path('status/<int:scraping_id>/', views.ScrapingStatusView.as_view(), name='scraping-status-detail'),
+    path('status/<int:scraping_id>/stream/', views.ScrapingStatusStreamView.as_view(), name='scraping-status-stream'),
     path('stop/', views.StopScrapingView.as_view(), name='stop-scraping'),
+    path('pause/', views.PauseScrapingView.as_view(), name='pause-scraping'),
+    path('resume/', views.ResumeScrapingView.as_view(), name='resume-scraping'),
     # path('stats/', views.ScrapingStatsView.as_view(), name='scraping-stats'),
     path('book_list/', views.BookListView.as_view(), name='all-books'),
     path('book_detail/<int:pk>/', views.BookDetailView.as_view(), name='detail-books'),
@@ -1,12 +1,11 @@
-import io
-import threading
-from contextlib import redirect_stdout, redirect_stderr
+import json
+import time
 
-from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from django.db.models import Q
-from django.db.models import Count
+from django.db.models import Count, Prefetch
 
 from rest_framework import status, filters
 from rest_framework.views import APIView
@@ -26,12 +25,17 @@ from rest_framework.mixins import (
 )
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework import status, permissions
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as django_filters
 
-from .models import Book, ScrapingLog
+from .catalog_cache import cache_catalog_response
+from .models import Book, Genre, ScrapingLog, SimilarBook
+from .pagination import BookCursorPagination
+from .search import filter_title, search_books
 from .serializers import BookListSerializer, BookSerializer, ScrapingLogSerializer
+from .tasks import ACTIVE_STATUSES, enqueue_scraping, reclaim_stale_scrapings
 
 
 class BookFilter(django_filters.FilterSet):
@@ -57,10 +61,7 @@ class BookFilter(django_filters.FilterSet):
         fields = ['genre', 'title', 'search']
     
     def filter_search(self, queryset, name, value):
-        return queryset.filter(
-            Q(title__icontains=value) | 
-            Q(description__icontains=value)
-        )
+        return search_books(queryset, value)
 
 
 class AdminRequiredMixin:
@@ -68,7 +69,8 @@ class AdminRequiredMixin:
 
 
 class BookQuerysetMixin:
-    queryset = Book.objects.all()
+    # search_vector is only read inside the database
+    queryset = Book.objects.select_related('genre').defer('search_vector')
     
     filter_backends = [
         DjangoFilterBackend, 
@@ -81,14 +83,29 @@ class BookQuerysetMixin:
     ordering = ['-created_at']  
 
 
-class BookListView(BookQuerysetMixin, ListAPIView):
+class GenreCountsMixin:
+    def get_serializer(self, *args, **kwargs):
+        if args and kwargs.get('many'):
+            # Book counts of just the genres on the page, in one query
+            genre_ids = {book.genre_id for book in args[0] if book.genre_id}
+            kwargs['context'] = self.get_serializer_context()
+            kwargs['context']['genre_books_counts'] = dict(
+                Genre.objects.filter(id__in=genre_ids).order_by()
+                .annotate(books_count=Count('book')).values_list('id', 'books_count')
+            ) if genre_ids else {}
+        return super().get_serializer(*args, **kwargs)
+
+
+class BookListView(GenreCountsMixin, BookQuerysetMixin, ListAPIView):
     serializer_class = BookListSerializer
+    pagination_class = BookCursorPagination
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
         genre = self.request.query_params.get('genre', None)
         title = self.request.query_params.get('title', None)
+        fuzzy = self.request.query_params.get('fuzzy', '')
         search = self.request.query_params.get('search', None)
         image = self.request.query_params.get('image', None)
 
@@ -96,7 +113,7 @@ class BookListView(BookQuerysetMixin, ListAPIView):
             queryset = queryset.filter(genre__name__icontains=genre)
                 
         if title:
-            queryset = queryset.filter(title__icontains=title)
+            queryset = filter_title(queryset, title, fuzzy=fuzzy.lower() in ['true', '1', 'yes'])
 
         if image:
             if image.lower() in ['true', '1', 'yes']:
@@ -105,39 +122,34 @@ class BookListView(BookQuerysetMixin, ListAPIView):
                 queryset = queryset.filter(Q(image__isnull=True) | Q(image=''))
             
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search)
-            )
+            queryset = search_books(queryset, search)
         
         return queryset
     
+    @cache_catalog_response
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        page = self.paginate_queryset(queryset)
-        
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
     
         active_filters = {}
-        for param in ['genre', 'title', 'image', 'search']:
+        for param in ['genre', 'title', 'fuzzy', 'image', 'search']:
             value = request.query_params.get(param)
             if value:
                 active_filters[param] = value
         
-        response_data = {
-            'count': queryset.count(),
-            'active_filters': active_filters,
-            'results': serializer.data
-        }
-        
-        return Response(response_data)
+        response.data['active_filters'] = active_filters
+        return response
+
+
+class SimilarBooksMixin:
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related(
+            Prefetch('similar_links', queryset=SimilarBook.objects.select_related('similar'))
+        )
 
 
-class BookDetailView(BookQuerysetMixin, RetrieveAPIView):
+class BookDetailView(SimilarBooksMixin, BookQuerysetMixin, RetrieveAPIView):
     serializer_class = BookSerializer
     
     def retrieve(self, request, *args, **kwargs):
@@ -151,7 +163,7 @@ class BookDetailView(BookQuerysetMixin, RetrieveAPIView):
                 response_data['image_metadata'] = {
                     'has_image': True,
                     'image_name': instance.image.name,
-                    'image_size': instance.image.size if hasattr(instance.image, 'size') else None,
+                    'image_size': instance.image_size,
                 }
             else:
                 response_data['image_metadata'] = {
@@ -200,10 +212,12 @@ class ScrapingLogQuerysetMixin:
 
 class ScrapingValidationMixin:
     def check_running_scraping(self):
-        return ScrapingLog.objects.filter(status='running').exists()
+        # A job whose process died would block new ones forever
+        reclaim_stale_scrapings()
+        return ScrapingLog.objects.filter(status__in=ACTIVE_STATUSES).exists()
     
     def get_running_scraping_logs(self):
-        return ScrapingLog.objects.filter(status='running')
+        return ScrapingLog.objects.filter(status__in=ACTIVE_STATUSES)
 
 
 class StartScrapingView(AdminRequiredMixin, ScrapingValidationMixin, CreateAPIView):
@@ -216,43 +230,24 @@ class StartScrapingView(AdminRequiredMixin, ScrapingValidationMixin, CreateAPIVi
                 status=status.HTTP_409_CONFLICT
             )
         
-        scraping_log = ScrapingLog.objects.create()
-        
         pages_limit = request.data.get('pages', None)
+        options = {}
+        if pages_limit:
+            try:
+                options['pages'] = int(pages_limit)
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'pages must be an integer'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
-        scraping_thread = threading.Thread(
-            target=self._run_scraping, 
-            args=(scraping_log, pages_limit)
-        )
-        scraping_thread.daemon = True
-        scraping_thread.start()
+        scraping_log = enqueue_scraping(**options)
         
         return Response({
-            'message': 'Scraping started',
+            'message': 'Scraping queued',
             'scraping_id': scraping_log.id,
-            'status': 'running'
+            'status': scraping_log.status
         }, status=status.HTTP_202_ACCEPTED)
-    
-    def _run_scraping(self, scraping_log, pages_limit=None):
-        try:
-            stdout_capture = io.StringIO()
-            stderr_capture = io.StringIO()
-            
-            with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-                if pages_limit:
-                    call_command('scrape_books', pages=pages_limit)
-                else:
-                    call_command('scrape_books')
-            
-            scraping_log.status = 'completed'
-            scraping_log.total_books_found = Book.objects.count()
-            
-        except Exception as e:
-            scraping_log.status = 'failed'
-            scraping_log.error_message = str(e)
-        finally:
-            scraping_log.finished_at = timezone.now()
-            scraping_log.save()
 
 
 from drf_yasg.utils import swagger_auto_schema
@@ -284,12 +279,13 @@ class ScrapingStatusView(AdminRequiredMixin, ScrapingLogQuerysetMixin, APIView):
                     type=openapi.TYPE_OBJECT,
                     properties={
                         'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID скрапінгу'),
-                        'status': openapi.Schema(type=openapi.TYPE_STRING, description='Статус (running, completed, failed, interrupted)'),
+                        'status': openapi.Schema(type=openapi.TYPE_STRING, description='Статус (queued, running, paused, completed, failed, interrupted)'),
                         'started_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, description='Час початку'),
                         'finished_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, description='Час завершення'),
                         'total_products': openapi.Schema(type=openapi.TYPE_INTEGER, description='Загальна кількість товарів'),
                         'processed_products': openapi.Schema(type=openapi.TYPE_INTEGER, description='Оброблено товарів'),
                         'error_message': openapi.Schema(type=openapi.TYPE_STRING, description='Повідомлення про помилку'),
+                        'stats': openapi.Schema(type=openapi.TYPE_OBJECT, description='Throttle/circuit state and per-stage timings (count, total_seconds, p50_ms, p95_ms)'),
                     }
                 )
             ),
@@ -328,6 +324,80 @@ class ScrapingStatusView(AdminRequiredMixin, ScrapingLogQuerysetMixin, APIView):
         return Response(serializer.data)
 
 
+class EventStreamRenderer(BaseRenderer):
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses are rendered; the stream itself is written directly
+        return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+class ScrapingStatusStreamView(AdminRequiredMixin, APIView):
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+    
+    # An open stream holds a server worker and runs one query per
+    # POLL_INTERVAL, so streams are kept short: they end after MAX_DURATION
+    # and the client reconnects (EventSource does so on its own). The server
+    # closes the generator on the first write to a client that has gone
+    # away; heartbeats make sure that write comes within seconds.
+    POLL_INTERVAL = 1
+    HEARTBEAT_INTERVAL = 5
+    MAX_DURATION = 60
+    FINISHED_STATUSES = ('completed', 'failed', 'interrupted')
+    # Derived from the clock, so they change every second without new progress
+    VOLATILE_FIELDS = ('duration', 'pages_per_minute', 'books_per_minute', 'eta_seconds')
+    
+    @swagger_auto_schema(
+        operation_description="Server-sent events stream of the scraping progress. A 'progress' event with the scraping status is sent whenever the counters change; the stream ends when the scraping finishes or after a minute, when clients reconnect",
+        operation_summary="Scraping progress stream",
+        tags=['Scraping'],
+        responses={
+            200: openapi.Response(description="text/event-stream of 'progress' events"),
+            404: openapi.Response(description="Scraping was not found"),
+            403: openapi.Response(description="Access denied - administrator rights required"),
+        }
+    )
+    def get(self, request, scraping_id, *args, **kwargs):
+        if not ScrapingLog.objects.filter(id=scraping_id).exists():
+            return Response(
+                {'error': 'Scraping log not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        response = StreamingHttpResponse(
+            self._events(scraping_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    def _events(self, scraping_id):
+        yield 'retry: 2000\n\n'
+        
+        last_state = None
+        last_sent = started = time.monotonic()
+        while time.monotonic() - started < self.MAX_DURATION:
+            log = ScrapingLog.objects.filter(id=scraping_id).first()
+            if log is None:
+                return
+            
+            data = ScrapingLogSerializer(log).data
+            state = {key: value for key, value in data.items() if key not in self.VOLATILE_FIELDS}
+            if state != last_state:
+                last_state = state
+                last_sent = time.monotonic()
+                yield f"event: progress\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+            elif time.monotonic() - last_sent >= self.HEARTBEAT_INTERVAL:
+                last_sent = time.monotonic()
+                yield ': keep-alive\n\n'
+            
+            if log.status in self.FINISHED_STATUSES:
+                return
+            time.sleep(self.POLL_INTERVAL)
+
+
 class StopScrapingView(AdminRequiredMixin, ScrapingValidationMixin, APIView):
     
     @swagger_auto_schema(
@@ -365,16 +435,97 @@ class StopScrapingView(AdminRequiredMixin, ScrapingValidationMixin, APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        for log in running_logs:
-            log.status = 'interrupted'
-            log.finished_at = timezone.now()
-            log.save()
+        # Queued jobs never start; a running scraper notices the status
+        # change, drains in-flight requests, saves what it has and sets
+        # finished_at itself.
+        running_logs.filter(status='queued').update(
+            status='interrupted',
+            finished_at=timezone.now()
+        )
+        running_logs.update(status='interrupted')
         
         return Response({'message': 'Scraping was stopped'})
 
 
-class BookSearchView(BookQuerysetMixin, ListAPIView):
+class PauseScrapingView(AdminRequiredMixin, APIView):
+    
+    @swagger_auto_schema(
+        operation_description="Pause the running scraping. Requests in flight are finished and buffered books are saved; the crawl waits until it is resumed",
+        operation_summary="Pause scraping",
+        tags=['Scraping'],
+        responses={
+            200: openapi.Response(
+                description="Scraping was paused",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, example='Scraping was paused')
+                    }
+                )
+            ),
+            404: openapi.Response(
+                description="No running scraping",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'error': openapi.Schema(type=openapi.TYPE_STRING, example='No running scraping')
+                    }
+                )
+            ),
+            403: openapi.Response(description="Access denied - administrator rights required"),
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        if not ScrapingLog.objects.filter(status='running').update(status='paused'):
+            return Response(
+                {'error': 'No running scraping'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response({'message': 'Scraping was paused'})
+
+
+class ResumeScrapingView(AdminRequiredMixin, APIView):
+    
+    @swagger_auto_schema(
+        operation_description="Resume a paused scraping",
+        operation_summary="Resume scraping",
+        tags=['Scraping'],
+        responses={
+            200: openapi.Response(
+                description="Scraping was resumed",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, example='Scraping was resumed')
+                    }
+                )
+            ),
+            404: openapi.Response(
+                description="No paused scraping",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'error': openapi.Schema(type=openapi.TYPE_STRING, example='No paused scraping')
+                    }
+                )
+            ),
+            403: openapi.Response(description="Access denied - administrator rights required"),
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        if not ScrapingLog.objects.filter(status='paused').update(status='running'):
+            return Response(
+                {'error': 'No paused scraping'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response({'message': 'Scraping was resumed'})
+
+
+class BookSearchView(GenreCountsMixin, BookQuerysetMixin, ListAPIView):
     serializer_class = BookListSerializer
+    pagination_class = BookCursorPagination
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -384,84 +535,81 @@ class BookSearchView(BookQuerysetMixin, ListAPIView):
         if genre:
             filters['genre__name__icontains'] = genre
                 
-        title = self.request.query_params.get('title')
-        if title:
-            filters['title__icontains'] = title
-            
         if filters:
             queryset = queryset.filter(**filters)
+        
+        title = self.request.query_params.get('title')
+        if title:
+            fuzzy = self.request.query_params.get('fuzzy', '')
+            queryset = filter_title(queryset, title, fuzzy=fuzzy.lower() in ['true', '1', 'yes'])
     
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(genre__icontains=search)
-            )
+            queryset = search_books(queryset, search)
         
         return queryset
     
+    @cache_catalog_response
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
         
         search_params = {
             'genre': request.query_params.get('genre'),
             'title': request.query_params.get('title'),
+            'fuzzy': request.query_params.get('fuzzy'),
             'search': request.query_params.get('search'),
         }
         
         active_search = {k: v for k, v in search_params.items() if v}
         
-        return Response({
+        response_data = {
             'search_parameters': active_search,
-            'total_found': queryset.count(),
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
             'books': serializer.data
-        })
+        }
+        if self.paginator.count is not None:
+            response_data['total_found'] = self.paginator.count
+        
+        return Response(response_data)
 
 
 class BookStatsView(APIView):
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
+        stats = dict(self._catalog_stats(request).data)
+        # Scraping status changes without a catalog change, so it isn't cached
+        stats['last_scraping'] = self._last_scraping()
+        return Response(stats)
+    
+    @cache_catalog_response
+    def _catalog_stats(self, request):
         total_books = Book.objects.count()
-        
-        genres = Book.objects.values_list('genre', flat=True).distinct().order_by('genre')
-        genres = [g for g in genres if g]  
+        recent_books = Book.objects.filter(
+            created_at__gte=timezone.now() - timezone.timedelta(days=7)
+        ).count()
         
         return Response({
             'total_books': total_books,
-            'available_genres': list(genres),
+            'books_added_last_week': recent_books,
             'filter_examples': {
                 'by_genre': '/book_list/?genre=фантастика',
                 'by_title': '/book_list/?title=гаррі',
+                'by_title_with_typos': '/book_list/?title=гарі&fuzzy=true',
                 'general_search': '/book_list/?search=магія',
                 'combined': '/book_list/?genre=фантастика&year_from=2010&search=дракон'
             }
         })
     
-    def get(self, request, *args, **kwargs):
-        stats = self._calculate_stats()
-        return Response(stats)
-    
-    def _calculate_stats(self):
-        total_books = Book.objects.count()
-        recent_books = Book.objects.filter(
-            created_at__gte=timezone.now() - timezone.timedelta(days=7)
-        ).count()
-        
+    def _last_scraping(self):
         last_scraping = ScrapingLog.objects.first()
+        if not last_scraping:
+            return None
         
-        stats = {
-            'total_books': total_books,
-            'books_added_last_week': recent_books,
-            'last_scraping': None
+        return {
+            'date': last_scraping.started_at,
+            'status': last_scraping.status,
+            'books_created': last_scraping.books_created,
+            'books_updated': last_scraping.books_updated,
+            'books_unchanged': last_scraping.books_unchanged
         }
-        
-        if last_scraping:
-            stats['last_scraping'] = {
-                'date': last_scraping.started_at,
-                'status': last_scraping.status,
-                'books_created': last_scraping.books_created,
-                'books_updated': last_scraping.books_updated
-            }
-        
-        return stats
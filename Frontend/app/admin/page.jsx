@@ -4,16 +4,28 @@ import { useState, useEffect } from "react"
 import Link from "next/link"
 import { useRouter } from "next/navigation"
 import { Plus, Edit, Trash2, Users, BookOpen } from "lucide-react"
-import { useAppSelector } from "@/lib/hooks"
+import { useAppSelector, useCursorPages } from "@/lib/hooks"
 import { useGetBooksQuery } from "@/lib/api/booksApi"
 import Breadcrumb from "@/components/breadcrumb"
-import Pagination from "@/components/pagination"
+import CursorPagination from "@/components/cursor-pagination"
 
 export default function AdminPage() {
   const { user, isAuthenticated } = useAppSelector((state) => state.auth)
   const router = useRouter()
-  const [currentPage, setCurrentPage] = useState(1)
-  const { data: booksData, isLoading } = useGetBooksQuery({ page: currentPage, limit: 10 })
+  const pages = useCursorPages()
+  const [totalBooks, setTotalBooks] = useState(0)
+  // Загальну кількість рахуємо лише для першої сторінки
+  const { data: booksData, isLoading } = useGetBooksQuery({
+    limit: 10,
+    cursor: pages.cursor,
+    count: !pages.cursor,
+  })
+
+  useEffect(() => {
+    if (booksData?.total != null) {
+      setTotalBooks(booksData.total)
+    }
+  }, [booksData?.total])
 
   // Перевірка доступу до адмін панелі
   useEffect(() => {
@@ -40,9 +52,6 @@ export default function AdminPage() {
     )
   }
 
-  // Розрахунок загальної кількості сторінок
-  const totalPages = Math.ceil((booksData?.total || 0) / 10)
-
   return (
     <div className="px-6 py-12">
       <div className="max-w-7xl mx-auto">
@@ -61,7 +70,7 @@ export default function AdminPage() {
                 <BookOpen className="w-6 h-6 text-white" />
               </div>
               <div>
-                <h3 className="text-2xl font-bold text-black">{booksData?.total || 0}</h3>
+                <h3 className="text-2xl font-bold text-black">{totalBooks}</h3>
                 <p className="text-brown-secondary">Total Books</p>
               </div>
             </div>
@@ -181,12 +190,14 @@ export default function AdminPage() {
               </div>
 
               {/* Додана пагінація всередині умови */}
-              {totalPages > 1 && (
+              {(booksData.previousCursor || booksData.nextCursor) && (
                 <div className="mt-8">
-                  <Pagination 
-                    currentPage={currentPage}
-                    totalPages={totalPages}
-                    onPageChange={setCurrentPage}
+                  <CursorPagination
+                    currentPage={pages.number}
+                    hasPrevious={!!booksData.previousCursor}
+                    hasNext={!!booksData.nextCursor}
+                    onPrevious={() => pages.goPrevious(booksData.previousCursor)}
+                    onNext={() => pages.goNext(booksData.nextCursor)}
                   />
                 </div>
               )}
@@ -1,10 +1,11 @@
 "use client"
 
-import { useState } from "react"
+import { useEffect, useState } from "react"
 import { Search, Filter } from "lucide-react"
 import { useGetBooksQuery } from "@/lib/api/booksApi"
+import { useCursorPages } from "@/lib/hooks"
 import BookCard from "@/components/book-card"
-import Pagination from "@/components/pagination"
+import CursorPagination from "@/components/cursor-pagination"
 
 export default function HomePage() {
   const [searchParams, setSearchParams] = useState({
@@ -12,19 +13,34 @@ export default function HomePage() {
     genre: "",
     fromYear: "",
     toYear: "",
-    page: 1,
     limit: 12,
   })
   const [showFilters, setShowFilters] = useState(false)
+  const [total, setTotal] = useState(0)
 
-  const { data, isLoading, error } = useGetBooksQuery(searchParams)
+  // Нові фільтри - знову з першої сторінки
+  const pages = useCursorPages(
+    [searchParams.title, searchParams.genre, searchParams.fromYear, searchParams.toYear].join("|")
+  )
+  // Загальну кількість рахуємо лише для першої сторінки
+  const { data, isLoading, error } = useGetBooksQuery({
+    ...searchParams,
+    cursor: pages.cursor,
+    count: !pages.cursor,
+  })
+
+  useEffect(() => {
+    if (data?.total != null) {
+      setTotal(data.total)
+    }
+  }, [data?.total])
 
   const handleSearch = () => {
-    setSearchParams((prev) => ({ ...prev, page: 1 }))
+    pages.reset()
   }
 
-  const handlePageChange = (newPage) => {
-    setSearchParams((prev) => ({ ...prev, page: newPage }))
+  const handlePageChange = (cursor, goToPage) => {
+    goToPage(cursor)
     window.scrollTo({ top: 0, behavior: "smooth" })
   }
 
@@ -34,14 +50,10 @@ export default function HomePage() {
       genre: "",
       fromYear: "",
       toYear: "",
-      page: 1,
       limit: 12,
     })
   }
 
-  // Розрахунок загальної кількості сторінок
-  const totalPages = Math.ceil((data?.total || 0) / searchParams.limit)
-
   if (isLoading)
     return (
       <div className="min-h-screen flex items-center justify-center bg-cream">
@@ -87,7 +99,7 @@ export default function HomePage() {
             </p>
             <div className="flex flex-wrap justify-center gap-4 animate-fade-in" style={{ animationDelay: "0.3s" }}>
               <div className="bg-white/20 backdrop-blur-sm rounded-lg px-6 py-3 text-white font-medium">
-                📚 {data?.total || 0}+ Books
+                📚 {total}+ Books
               </div>
               <div className="bg-white/20 backdrop-blur-sm rounded-lg px-6 py-3 text-white font-medium">
                 ⭐ Top Rated
@@ -213,7 +225,7 @@ export default function HomePage() {
                   : "All Books"}
               </h3>
               <p className="text-brown-secondary">
-                {data?.total ? `${data.total} books found` : "No books found"}
+                {total ? `${total} books found` : "No books found"}
                 {searchParams.title && ` for "${searchParams.title}"`}
               </p>
             </div>
@@ -241,11 +253,13 @@ export default function HomePage() {
                 ))}
               </div>
 
-              {/* Використання компонента Pagination */}
-              <Pagination 
-                currentPage={searchParams.page}
-                totalPages={totalPages}
-                onPageChange={handlePageChange}
+              {/* Курсорна пагінація: вперед/назад за посиланнями відповіді */}
+              <CursorPagination
+                currentPage={pages.number}
+                hasPrevious={!!data.previousCursor}
+                hasNext={!!data.nextCursor}
+                onPrevious={() => handlePageChange(data.previousCursor, pages.goPrevious)}
+                onNext={() => handlePageChange(data.nextCursor, pages.goNext)}
               />
             </>
           ) : (
@@ -284,7 +298,6 @@ export default function HomePage() {
                     setSearchParams((prev) => ({
                       ...prev,
                       genre: category.name.toLowerCase().replace(" ", "-"),
-                      page: 1,
                     }))
                   }
                   className={`${category.color} rounded-2xl p-6 text-center hover:scale-105 transition-all duration-300 shadow-lg hover:shadow-xl`}
@@ -4,7 +4,7 @@ import { useState, useEffect } from "react"
 import { useRouter } from "next/navigation"
 import Link from "next/link"
 import { ArrowLeft, Download, Filter, BookOpen } from "lucide-react"
-import { useGetBooksQuery } from "@/lib/api/booksApi"
+import { useGetAllBooksQuery } from "@/lib/api/booksApi"
 import { useAppSelector } from "@/lib/hooks"
 import Breadcrumb from "@/components/breadcrumb"
 import toast from "react-hot-toast"
@@ -18,7 +18,8 @@ export default function ExportBooksPage() {
   const [exportFormat, setExportFormat] = useState("excel")
   const [isExporting, setIsExporting] = useState(false)
 
-  const { data, isLoading, error } = useGetBooksQuery({ limit: 100 })
+  // Експортуємо весь каталог, а не лише першу сторінку
+  const { data, isLoading, error } = useGetAllBooksQuery()
 
   useEffect(() => {
     if (!isAuthenticated) {
@@ -0,0 +1,23 @@
+export default function CursorPagination({ currentPage, hasPrevious, hasNext, onPrevious, onNext }) {
+  return (
+    <div className="flex justify-center items-center space-x-2 mt-8">
+      <button
+        onClick={onPrevious}
+        disabled={!hasPrevious}
+        className="px-3 py-1 rounded-md border border-brown-secondary disabled:opacity-50"
+      >
+        &laquo;
+      </button>
+
+      <span className="px-3 py-1 rounded-md bg-brown-primary text-white">{currentPage}</span>
+
+      <button
+        onClick={onNext}
+        disabled={!hasNext}
+        className="px-3 py-1 rounded-md border border-brown-secondary disabled:opacity-50"
+      >
+        &raquo;
+      </button>
+    </div>
+  );
+}
@@ -1,6 +1,12 @@
 import { createApi, fetchBaseQuery } from "@reduxjs/toolkit/query/react"
 import { getAuthToken } from "../utils/cookies"
 
+// Найбільший page_size, який приймає book_list
+const MAX_PAGE_SIZE = 100
+
+// Дістаємо курсор з посилання next/previous (null, якщо сторінки немає)
+const cursorFromLink = (link) => (link ? new URL(link).searchParams.get("cursor") : null)
+
 export const booksApi = createApi({
   reducerPath: "booksApi",
   baseQuery: fetchBaseQuery({
@@ -36,12 +42,16 @@ export const booksApi = createApi({
         const requestConfig = {
           url: "/scraping/book_list/",
           params: {
-            ...params,
             // Видаляємо пусті параметри
             ...(params?.title && { title: params.title }),
             ...(params?.genre && { genre: params.genre }),
             ...(params?.fromYear && { fromYear: params.fromYear }),
             ...(params?.toYear && { toYear: params.toYear }),
+            // Курсорна пагінація: сторінку задає курсор з посилань next/previous
+            ...(params?.limit && { page_size: params.limit }),
+            ...(params?.cursor && { cursor: params.cursor }),
+            // COUNT(*) по всьому каталогу - лише там, де показується загальна кількість
+            ...(params?.count && { count: true }),
           },
         }
 
@@ -56,31 +66,12 @@ export const booksApi = createApi({
       transformResponse: (response, meta, arg) => {
         console.log("📚 Books API Response:", response)
 
-        // Якщо відповідь має структуру Django REST framework pagination
-        if (response && typeof response === "object" && response.results) {
-          return {
-            books: response.results || [],
-            total: response.count || 0,
-            page: arg?.page || 1,
-            limit: arg?.limit || 12,
-          }
-        }
-
-        // Якщо відповідь - це просто масив книг
-        if (Array.isArray(response)) {
-          return {
-            books: response,
-            total: response.length,
-            page: arg?.page || 1,
-            limit: arg?.limit || 12,
-          }
-        }
-
-        // Якщо відповідь вже в очікуваному форматі
         return {
-          books: response?.books || response || [],
-          total: response?.total || response?.count || 0,
-          page: arg?.page || 1,
+          books: response?.results || [],
+          // null, якщо загальну кількість не запитували
+          total: response?.count ?? null,
+          nextCursor: cursorFromLink(response?.next),
+          previousCursor: cursorFromLink(response?.previous),
           limit: arg?.limit || 12,
         }
       },
@@ -92,6 +83,28 @@ export const booksApi = createApi({
       },
       providesTags: ["Book"],
     }),
+    getAllBooks: builder.query({
+      // Проходимо всі сторінки за посиланнями next, поки вони є
+      async queryFn(params, api, extraOptions, fetchWithBQ) {
+        const books = []
+        let cursor = null
+        do {
+          const result = await fetchWithBQ({
+            url: "/scraping/book_list/",
+            params: { page_size: MAX_PAGE_SIZE, ...(cursor && { cursor }) },
+          })
+          if (result.error) {
+            console.error("🚨 All Books API Error:", result.error)
+            return { error: result.error }
+          }
+          books.push(...result.data.results)
+          cursor = cursorFromLink(result.data.next)
+        } while (cursor)
+
+        return { data: { books, total: books.length } }
+      },
+      providesTags: ["Book"],
+    }),
     getBookById: builder.query({
       query: (id) => `/scraping/book_detail/${id}/`,
       providesTags: (result, error, id) => [{ type: "Book", id }],
@@ -135,6 +148,7 @@ export const booksApi = createApi({
 
 export const {
   useGetBooksQuery,
+  useGetAllBooksQuery,
   useGetBookByIdQuery,
   useGetRecommendedBooksQuery,
   useGetFavoritesQuery,
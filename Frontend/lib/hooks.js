@@ -1,5 +1,24 @@
+import { useEffect, useState } from "react"
 import { useDispatch, useSelector, useStore } from "react-redux"
 
 export const useAppDispatch = () => useDispatch()
 export const useAppSelector = useSelector
 export const useAppStore = () => useStore()
+
+// Курсорна пагінація: сторінки відкриваються лише за курсорами next/previous
+// попередньої відповіді. Зміна resetKey (наприклад, фільтрів) повертає на першу сторінку.
+export const useCursorPages = (resetKey) => {
+  const [page, setPage] = useState({ cursor: null, number: 1 })
+
+  useEffect(() => {
+    setPage({ cursor: null, number: 1 })
+  }, [resetKey])
+
+  return {
+    cursor: page.cursor,
+    number: page.number,
+    goNext: (cursor) => setPage((prev) => ({ cursor, number: prev.number + 1 })),
+    goPrevious: (cursor) => setPage((prev) => ({ cursor, number: prev.number - 1 })),
+    reset: () => setPage({ cursor: null, number: 1 }),
+  }
+}